@@ -0,0 +1,101 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark for building the graph of a configuration shown by the front-end.
+The assumptions and possibilities are generated for racks holding frames with a position.
+
+Run from the root directory as: python benchmarks/graph.py
+"""
+
+import argparse
+import json
+import time
+
+from clingo import parse_term
+
+from ooasp.assumptions import AssumptionStore
+from ooasp.REST.graph import GraphBuilder
+
+SIZES = [10, 100, 1000]
+POSITIONS = 8
+
+
+def configuration(n_objects):
+    """Generates a configuration of n_objects objects, one rack for every four frames
+
+    Parameters:
+        n_objects (int): Number of objects of the configuration
+
+    Returns:
+        tuple: The assumptions and the possibilities of the configuration
+    """
+    assumptions = []
+    possibilities = {"objects": [], "associations": [], "attrs": [], "smart_suggestions": [], "violations": []}
+    racks = list(range(1, n_objects + 1, 5))
+    for o_id in range(1, n_objects + 1):
+        if o_id in racks:
+            assumptions.append(f"ooasp_isa(rack,{o_id})")
+            possibilities["violations"].append({"violation_name": "lowerbound", "object_id": str(o_id),
+                                                "message": "Lowerbound for rack_frames not reached"})
+            continue
+        rack = o_id - (o_id - 1) % 5
+        assumptions.append(f"ooasp_isa(frame,{o_id})")
+        assumptions.append(f"ooasp_associated(rack_frames,{rack},{o_id})")
+        assumptions.append(f"ooasp_attr_value(frame_position,{o_id},{o_id % POSITIONS + 1})")
+        for r in racks[:3]:
+            possibilities["associations"].append({"from": str(r), "to": str(o_id), "assoc_name": "rack_frames"})
+        for p in range(1, POSITIONS + 1):
+            possibilities["attrs"].append({"name": "frame_position", "object_id": str(o_id), "value": str(p)})
+    return [parse_term(a) for a in assumptions], possibilities
+
+
+def build_graph(n_objects, repeat=5):
+    """Measures the time to build the graph of a configuration from scratch and after changing one assumption
+
+    Parameters:
+        n_objects (int): Number of objects of the configuration
+        repeat (int, optional): Number of measures, the best one is kept. Defaults to 5.
+
+    Returns:
+        dict: The time of a full build and of a build after one change, in seconds
+    """
+    assumptions, possibilities = configuration(n_objects)
+    full = incremental = float("inf")
+    for _ in range(repeat):
+        store = AssumptionStore(assumptions)
+        graph = GraphBuilder()
+        start = time.perf_counter()
+        graph.attach(store)
+        graph.build(possibilities)
+        full = min(full, time.perf_counter() - start)
+
+        # a change of the assumptions also changes the possibilities, so the index is rebuilt
+        changed = dict(possibilities)
+        start = time.perf_counter()
+        store.set_attribute_value(f"ooasp_attr_value(frame_position,2,{POSITIONS})")
+        graph.build(changed)
+        incremental = min(incremental, time.perf_counter() - start)
+    return {"full": full, "incremental": incremental}
+
+
+def run(sizes, name=None):
+    results = {}
+    for n_objects in sizes:
+        results[n_objects] = build_graph(n_objects)
+        print(f"{n_objects:>6} objects: full {results[n_objects]['full'] * 1000:.3f} ms, "
+              f"after one change {results[n_objects]['incremental'] * 1000:.3f} ms")
+    if name is not None:
+        f_name = f"benchmarks/results/{name}.json"
+        with open(f_name, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+        print("Results saved in " + f_name)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Numbers of objects separated by ','")
+    parser.add_argument("--save", default=None, help="Name of the results file in benchmarks/results")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.save)
@@ -0,0 +1,59 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark for the grounding time per object when objects are added in batches.
+
+Run from the root directory as: python benchmarks/grounding.py
+"""
+
+import argparse
+import json
+import os
+
+from ooasp.smart_ooasp import SmartOOASPSolver
+
+BATCH_SIZES = [1, 5, 10, 20, 40]
+
+
+def ground_in_batches(n_objects, batch_size, cls="elementA"):
+    """Adds n_objects of class cls to a new solver in batches of size batch_size
+
+    Parameters:
+        n_objects (int): Number of objects to add
+        batch_size (int): Number of objects grounded with one grounding call
+        cls (str, optional): Class of the objects. Defaults to "elementA".
+
+    Returns:
+        float: The grounding time per object
+    """
+    solver = SmartOOASPSolver()
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
+    solver.load_base()
+    for i in range(0, n_objects, batch_size):
+        solver.add_objects([cls] * min(batch_size, n_objects - i))
+    return solver.times["ground"] / n_objects
+
+
+def run(n_objects, batch_sizes, cls, name=None):
+    results = {}
+    for batch_size in batch_sizes:
+        results[batch_size] = ground_in_batches(n_objects, batch_size, cls)
+        print(f"batch size {batch_size:>4}: {results[batch_size] * 1000:.3f} ms per object")
+    if name is not None:
+        f_name = f"benchmarks/results/{name}.json"
+        with open(f_name, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+        print("Results saved in " + f_name)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=40, help="Number of objects to add")
+    parser.add_argument("--cls", default="elementA", help="Class of the objects to add")
+    parser.add_argument("--batch-sizes", default=",".join(map(str, BATCH_SIZES)),
+                        help="Batch sizes separated by ','")
+    parser.add_argument("--save", default=None, help="Name of the results file in benchmarks/results")
+    args = parser.parse_args()
+    run(args.objects, [int(b) for b in args.batch_sizes.split(",")], args.cls, args.save)
@@ -0,0 +1,78 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark for the time spent adding objects in the UNSAT steps of smart_complete with and without the object pool.
+The frames are added in two calls of smart_complete, like a user adding frames in the interactive configurator,
+so that the second call can take its objects from the pool refilled after the first model.
+A call that reaches the time limit is stopped; the objects added in its UNSAT steps until then are still measured.
+
+Run from the root directory as: python benchmarks/object_pool.py
+"""
+
+import argparse
+import os
+import time
+
+from ooasp.smart_ooasp import BudgetExceeded, SmartOOASPSolver
+
+POOL_SIZES = [0, 4, 8]
+
+
+def complete_frames(first, second, pool_size, time_limit=None):
+    """Completes a configuration with first frames, then adds second frames and completes it again
+
+    Parameters:
+        first (int): Number of frames of the first call of smart_complete
+        second (int): Number of frames added before the second call
+        pool_size (int): Size of the object pool
+        time_limit (float, optional): Seconds each call may take. Defaults to None.
+
+    Returns:
+        list[dict]: For each call, its time, the time spent adding objects in its UNSAT steps,
+                    the part of it spent grounding the pool, the number of objects of the configuration
+                    and whether a model was found
+    """
+    solver = SmartOOASPSolver(["frame"] * first, object_pool_size=pool_size, time_limit=time_limit)
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
+    solver.load_base()
+    solver.create_initial_objects()
+    add_placeholder_objects = solver.add_placeholder_objects
+    spent = {}
+
+    def timed(n=1):
+        start, pool = time.time(), solver.times["pool"]
+        ids = add_placeholder_objects(n)
+        spent["expansion"] += time.time() - start
+        spent["pool"] += solver.times["pool"] - pool
+        return ids
+    solver.add_placeholder_objects = timed
+    calls = []
+    for n in [0, second]:
+        solver.add_objects(["frame"] * n)
+        spent.update(expansion=0.0, pool=0.0)
+        start = time.time()
+        try:
+            solver.smart_complete()
+            done = True
+        except BudgetExceeded:
+            done = False
+        calls.append({"time": time.time() - start, **spent, "objects": solver.size, "done": done})
+        if not done:
+            break
+    return calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--first", type=int, default=4, help="Number of frames of the first call")
+    parser.add_argument("--second", type=int, default=13, help="Number of frames added for the second call")
+    parser.add_argument("--pool-sizes", default=",".join(map(str, POOL_SIZES)), help="Pool sizes separated by ','")
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds each call may take")
+    args = parser.parse_args()
+    for pool_size in [int(p) for p in args.pool_sizes.split(",")]:
+        for i, call in enumerate(complete_frames(args.first, args.second, pool_size, args.time_limit), 1):
+            print(f"pool {pool_size:>2}, call {i}: {call['time']:.2f} s{'' if call['done'] else ' (time limit)'}, "
+                  f"{call['objects']} objects, "
+                  f"adding objects in UNSAT steps {call['expansion'] * 1000:.1f} ms "
+                  f"(pool grounding {call['pool'] * 1000:.1f} ms)", flush=True)
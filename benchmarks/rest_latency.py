@@ -0,0 +1,110 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+"""
+Load test of the REST server: measures the latency of the heartbeat while other sessions
+add objects and compute their brave consequences.
+The requests are sent to the application in the same process and event loop, as uvicorn would.
+
+Run from the root directory as: python benchmarks/rest_latency.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ooasp", "REST"))
+import solver_api  # noqa: E402
+
+INITIAL_OBJECTS = "rack,frame,frame,frame,frame,element,element"
+
+
+async def heartbeat(client, stop, interval=0.02):
+    """Sends heartbeats until stop is set
+
+    Parameters:
+        client (httpx.AsyncClient): Client of the application
+        stop (asyncio.Event): Set to stop sending heartbeats
+        interval (float, optional): Seconds between two heartbeats. Defaults to 0.02.
+
+    Returns:
+        list: The latency of each heartbeat in seconds
+    """
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/system/flags/heartbeat")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def work(client, session_id, rounds):
+    """Adds a frame and computes the brave consequences of a session, rounds times"""
+    headers = {"X-Session-Id": session_id}
+    for _ in range(rounds):
+        await client.put("/configurator/add/frame", headers=headers)
+        await client.get("/configurator/brave/json", headers=headers)
+
+
+def summary(latencies):
+    return {"requests": len(latencies),
+            "median": statistics.median(latencies),
+            "p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0],
+            "max": max(latencies)}
+
+
+async def run(n_sessions, rounds, idle):
+    transport = httpx.ASGITransport(app=solver_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        session_ids = [f"load-{i}" for i in range(n_sessions)]
+        for session_id in session_ids:
+            await client.post("/system/actions/initialise", json={"objects": INITIAL_OBJECTS},
+                              headers={"X-Session-Id": session_id})
+
+        stop = asyncio.Event()
+        beats = asyncio.create_task(heartbeat(client, stop))
+        await asyncio.sleep(idle)
+        stop.set()
+        idle_latencies = await beats
+
+        stop = asyncio.Event()
+        beats = asyncio.create_task(heartbeat(client, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(work(client, session_id, rounds) for session_id in session_ids))
+        duration = time.perf_counter() - start
+        stop.set()
+        load_latencies = await beats
+    return {"idle": summary(idle_latencies), "load": summary(load_latencies), "load_duration": duration}
+
+
+def show(results):
+    for phase in ("idle", "load"):
+        r = results[phase]
+        print(f"{phase:>5}: {r['requests']:>5} heartbeats, median {r['median'] * 1000:.2f} ms, "
+              f"p95 {r['p95'] * 1000:.2f} ms, max {r['max'] * 1000:.2f} ms")
+    print(f"Load took {results['load_duration']:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=4, help="Number of sessions computing consequences")
+    parser.add_argument("--rounds", type=int, default=5, help="Objects added by each session")
+    parser.add_argument("--idle", type=float, default=1, help="Seconds measured without load")
+    parser.add_argument("--save", default=None, help="Name of the results file in benchmarks/results")
+    args = parser.parse_args()
+    # consequences are not read from the disk cache, so that every request computes them
+    solver_api.CACHE_DIR = None
+    results = asyncio.run(run(args.sessions, args.rounds, args.idle))
+    show(results)
+    if args.save is not None:
+        f_name = f"benchmarks/results/{args.save}.json"
+        with open(f_name, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+        print("Results saved in " + f_name)
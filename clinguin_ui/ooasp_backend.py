@@ -3,7 +3,8 @@
 
 from clinguin.server.application.backends import ClingraphBackend
 from ooasp.smart_ooasp import SmartOOASPSolver
-from clingo import Function, Control, parse_term
+from ooasp.config_format import load_facts
+from clingo import Function
 
 
 SAVE_FILE = "ooasp_configuration.lp"
@@ -45,15 +46,14 @@ class OOASPBackend(ClingraphBackend):
     def _add_assumption(self, symbol, value: bool = "true") -> None:
         # Overwrites
         super()._add_assumption(symbol, value)
-        self.smart_solver.assumptions.add(str(symbol))
+        self.smart_solver.assumptions.add(symbol)
 
     # ------ Operations
 
     def add_object(self, name: str, amount: int = 1) -> None:
         must_be_used = name != "object"
-        for obj in range(int(amount)):
-            # We force the use of the object to improve performance
-            self.smart_solver.add_object(name, must_be_used=must_be_used)
+        # We force the use of the object to improve performance
+        self.smart_solver.add_objects([name] * int(amount), must_be_used=must_be_used)
         self._outdate()
         self._set_external(Function("check_potential_cv"), "false")
 
@@ -79,25 +79,19 @@ class OOASPBackend(ClingraphBackend):
             '"'
         )  # It seems that passing the argument from the clinguin adds extra quotes which need to be removed
         self._restart()
-        ctl = Control(["1"])
-        ctl.load(f_path)
-        ctl.ground([("base", [])])
-        model = None
+        assumptions = load_facts(f_path)
         objects = {}
-        assumptions = []
-        with ctl.solve(yield_=True) as handle:
-            for model in handle:
-                for atom in model.symbols(atoms=True):
-                    assumptions.append(str(atom))
-                    if atom.match("ooasp_isa", 2):
-                        atom.arguments
-                        objects[atom.arguments[1].number] = atom.arguments[0].name
-                model = model.symbols(atoms=True)
+        for atom in assumptions:
+            if atom.match("ooasp_isa", 2):
+                objects[atom.arguments[1].number] = atom.arguments[0].name
         objects = dict(sorted(objects.items(), key=lambda x: x[0]))
+        batch = []
         for expected_next_id, c in objects.items():
-            while expected_next_id > self.smart_solver.next_id:
-                self.smart_solver.add_object("object", must_be_used=False)
-            self.smart_solver.add_object(c, must_be_used=True)
+            while expected_next_id > self.smart_solver.next_id + len(batch):
+                batch.append(("object", False))
+            batch.append((c, True))
+        self.smart_solver.add_objects(batch)
         for a in assumptions:
-            self._add_assumption(parse_term(a))
+            super()._add_assumption(a, "true")
+        self.smart_solver.assumptions.update(assumptions)
         self._set_external(Function("check_potential_cv"), "false")
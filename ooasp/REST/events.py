@@ -0,0 +1,66 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+
+def _put(queue: asyncio.Queue, item) -> None:
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        # slow clients miss events instead of slowing down the solver
+        pass
+
+
+class EventBroker:
+    """
+    Passes the events of the solver of a session to the clients subscribed to it.
+    Events can be published from any thread, each subscriber receives them in an asyncio queue
+    of its own event loop.
+    """
+
+    def __init__(self, max_queued: int = 1000) -> None:
+        """
+        Args:
+            max_queued (int): Maximum number of events queued for a subscriber, further events are dropped
+        """
+        self.max_queued = max_queued
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def publish(self, event: str, data: dict) -> None:
+        """
+        Sends an event to all subscribers.
+        """
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put, queue, (event, data))
+
+    @contextmanager
+    def subscribe(self):
+        """
+        Context manager subscribing to the events, yields the queue receiving them.
+        Must be used inside a running event loop.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.max_queued))
+        with self._lock:
+            self.subscribers.append(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self.subscribers.remove(subscriber)
+
+
+def sse(event: str, data: dict) -> str:
+    """
+    Formats an event as a server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -2,11 +2,13 @@
 # SPDX-License-Identifier: MIT
 
 from abc import ABC, abstractmethod
+from collections import defaultdict
 import os
 import os.path
 import json
 from pathlib import Path
 from fastapi import FastAPI
+import threading
 import uuid
 import shutil
 
@@ -213,15 +215,238 @@ class Domain:
         return not self._check_exists()
 
 
+class ConfigurationMap():
+    """
+    Domain, icon and description of the stored configurations, indexed by name and by domain.
+    The mapping is stored as a snapshot file and every change is appended to a journal next to it,
+    which is replayed on loading. Once the journal holds more changes than the mapping has entries,
+    the snapshot is replaced atomically and the journal is emptied, so a crash loses at most the
+    change being written.
+    """
+
+    def __init__(self, path, min_compaction=1000) -> None:
+        self.path = str(path)
+        self.journal_path = self.path + ".journal"
+        self.min_compaction = min_compaction
+        self.entries = {}
+        self.by_domain = defaultdict(dict)
+        self.journal_size = 0
+        self._lock = threading.Lock()
+        self._load()
+        self._journal = open(self.journal_path, "a")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(list(self.entries.values()))
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        for entry in entries:
+            self._put(entry)
+        if os.path.isfile(self.journal_path):
+            with open(self.journal_path, "rb+") as f:
+                end = 0
+                for line in f:
+                    try:
+                        change = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        change = None
+                    if change is None:
+                        # the last change was interrupted while being written, it is dropped so that
+                        # the next changes are not appended to it
+                        f.truncate(end)
+                        break
+                    self._apply(change)
+                    self.journal_size += 1
+                    end += len(line)
+        if not os.path.isfile(self.path):
+            self._write_snapshot()
+
+    def _put(self, entry):
+        old = self.entries.get(entry["name"])
+        if old is not None:
+            self.by_domain[old["domain"]].pop(old["name"], None)
+        self.entries[entry["name"]] = entry
+        self.by_domain[entry["domain"]][entry["name"]] = entry
+
+    def _delete(self, name):
+        entry = self.entries.pop(name, None)
+        if entry is not None:
+            self.by_domain[entry["domain"]].pop(name, None)
+        return entry
+
+    def _apply(self, change):
+        # changes are idempotent, since they may be replayed over a snapshot that already contains them
+        if change["op"] == "put":
+            self._put(change["entry"])
+        elif change["op"] == "delete":
+            self._delete(change["name"])
+        elif change["op"] == "rename":
+            entry = self._delete(change["name"])
+            if entry is not None:
+                self._put(dict(entry, name=change["new_name"]))
+
+    def _change(self, change):
+        with self._lock:
+            self._apply(change)
+            self._journal.write(json.dumps(change) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self.journal_size += 1
+            if self.journal_size > max(self.min_compaction, len(self.entries)):
+                self._compact()
+
+    def _write_snapshot(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.entries.values()), f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _compact(self):
+        self._write_snapshot()
+        self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        self.journal_size = 0
+
+    def compact(self):
+        """
+        Writes the whole mapping to the snapshot file and empties the journal.
+        """
+        with self._lock:
+            self._compact()
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def of_domain(self, domain):
+        """
+        Returns the configurations of a domain.
+        """
+        return list(self.by_domain.get(domain, {}).values())
+
+    def add(self, entry):
+        self._change({"op": "put", "entry": dict(entry)})
+        return self.entries[entry["name"]]
+
+    def update(self, name, **fields):
+        """
+        Changes fields of a configuration. Returns the changed entry, None if the configuration does not exist.
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        self._change({"op": "put", "entry": dict(entry, **fields)})
+        return self.entries[name]
+
+    def rename(self, name, new_name):
+        if name not in self.entries:
+            return None
+        self._change({"op": "rename", "name": name, "new_name": new_name})
+        return self.entries[new_name]
+
+    def delete(self, name):
+        if name not in self.entries:
+            return None
+        entry = self.entries[name]
+        self._change({"op": "delete", "name": name})
+        return entry
+
+
+class DomainRegistry():
+    """
+    Names and metadata of the domains, read from the domain directory once and kept in memory.
+    A cached entry is used while the modification time and size of its file are unchanged, so checking
+    it costs a call to stat instead of reading and parsing the file. Changes made through the RESTManager
+    also invalidate the entries of the domains they modify.
+    """
+
+    def __init__(self, domain_path) -> None:
+        self.domain_path = str(domain_path)
+        # stamp and metadata of each domain by name
+        self.domains = {}
+        self._names = []
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def names(self):
+        """
+        Returns the names of the domains, listing the domain directory only when it changed.
+        """
+        stamp = self._stat(self.domain_path)
+        with self._lock:
+            if stamp is None or stamp != self._stamp:
+                self._names = os.listdir(self.domain_path)
+                self._stamp = stamp
+            return list(self._names)
+
+    def metadata(self, name):
+        """
+        Returns the metadata of a domain, None if it has no readable metadata file.
+        The returned dictionary is shared and should not be modified.
+        """
+        path = os.path.join(self.domain_path, name, METADATA)
+        stamp = self._stat(path)
+        with self._lock:
+            if stamp is None:
+                self.domains.pop(name, None)
+                return None
+            cached = self.domains.get(name)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        try:
+            with open(path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.domains[name] = (stamp, metadata)
+        return metadata
+
+    def invalidate(self, *names):
+        """
+        Forgets the metadata of the given domains and the list of names.
+        """
+        with self._lock:
+            for name in names:
+                self.domains.pop(name, None)
+            self._stamp = None
+
+
 class RESTManager():
     def __init__(self, domain_path, configuration_path, path) -> None:
 
         self.MAPPING_FILE = os.path.join(path, "domain-config-map.json")
-        self.map_memo = None
+        self.configurations = ConfigurationMap(self.MAPPING_FILE)
         self.domain_path = domain_path
+        self.domains = DomainRegistry(domain_path)
         self.configuration_path = configuration_path
         self.run_id = str(uuid.uuid1())
-        self._load_mapping()
+
+    @property
+    def map_memo(self):
+        """
+        List of all configurations with their domain, icon and description.
+        """
+        return list(self.configurations)
 
     # ==========DOMAIN==========
 
@@ -233,94 +458,76 @@ class RESTManager():
             return False
         dom = Domain()._load(os.path.join(self.domain_path, name, METADATA))
         dom._register_template(template)
+        self.domains.invalidate(name)
         return True
 
     def get_domain_templates(self, name):
         """
         Returns list of all templates registered within requested domain.
         """
-        dom = Domain()._load(os.path.join(self.domain_path, name, METADATA))
-        return dom.templates
+        return list(self.domains.metadata(name)["templates"])
 
     def get_full_domain_response(self):
         """
         Builds a complete JSON representation of domains and configurations recognized by the system.
         """
         res = []
-        domains = self.get_all_domains()
-        for domain_name in domains:
+        for domain_name in self.domains.names():
+            domain = self.domains.metadata(domain_name)
             try:
-                domain = Domain(domain_name)._load(os.path.join(self.domain_path, domain_name, METADATA))
                 obj = {"name": domain_name,
-                       "description": domain.description,
-                       "icon": domain.icon,
-                       "configurations": list(filter(lambda d: d["domain"] == domain_name, self.map_memo))
+                       "description": domain["description"],
+                       "icon": domain["icon"],
+                       "configurations": self.configurations.of_domain(domain_name)
                        }
                 res.append(obj)
-            except:
+            except (KeyError, TypeError):
                 continue
         return res
 
-    def _load_mapping(self): 
-        """
-        Loads contents of configuration mapping file into the instance from physical memory.
-        """
-        try:
-            with open(self.MAPPING_FILE, "r+") as f:
-                content = json.load(f)
-                self.map_memo = content
-                return True
-        except:
-            with open(self.MAPPING_FILE, "w+") as f:
-                json.dump([], f, indent=4)
-                self.map_memo = []
-            return False
-
     def _save_mapping(self):
         """
         Saves current state of the configuration mapping into physical memory.
         """
-        with open(self.MAPPING_FILE, "w") as f:
-            json.dump(self.map_memo, f, indent=4)
-            return True
+        self.configurations.compact()
+        return True
 
     def get_all_domains(self):
         """
         Returns list of all directories within the loaded domain directory.
         """
-        return os.listdir(self.domain_path)
+        return self.domains.names()
 
     def new_domain(self, name):
         dom = Domain(name)
         dom.generate_new()
+        self.domains.invalidate(name)
         return str(dom.__dict__)
 
     def new_domain_with_content(self, name, content):
         dom = Domain(name)
         dom.generate_new(content=content)
+        self.domains.invalidate(name)
         return str(dom.__dict__)
 
     def get_domain_metadata(self, name):
-        available = os.listdir(self.domain_path)
-        if name not in available:
+        content = self.domains.metadata(name) if name in self.domains.names() else None
+        if content is None:
             return "Domain does not exist."
-        with open(os.path.join(self.domain_path, name, Domain.METADATA)) as f:
-            content = json.load(f)
-        return content
+        return dict(content)
 
     def delete_domain(self, name):
         """
         Deletes a corresponding domain.
         """
-        available = os.listdir(self.domain_path)
-        if name not in available:
+        if name not in self.domains.names():
             return "Domain does not exist."
         dom = Domain()._load(str(os.path.join(DEFAULT_LOCATION, SYS_FOLDER_NAME, DOMAIN_DIR, name, Domain.METADATA)))
-        if dom._delete():
-            for conf in self.map_memo:
-                if conf["domain"] == name:
-                    conf["domain"] == None
-            self._save_mapping()
+        deleted = dom._delete()
+        self.domains.invalidate(name)
+        if deleted:
+            for conf in self.configurations.of_domain(name):
+                self.configurations.update(conf["name"], domain=None)
             return "Domain deleted successfully."
         return "There was a problem removing the domain."
 
@@ -346,16 +553,17 @@ class RESTManager():
         if new_name is not None:
             dom._update_name(new_name, os.path.join(self.domain_path, new_name))
         dom._dump_metadata()
+        self.domains.invalidate(name, dom.name)
         dom.directory = str(dom.directory)
         return dom.__dict__
 
     def get_domain_description(self, name):
-        with open(str(os.path.join(DEFAULT_LOCATION, SYS_FOLDER_NAME, DOMAIN_DIR, name, Domain.METADATA)), "r")as f:
-            return json.load(f)["description"]
+        return self.domains.metadata(name)["description"]
 
     def update_domain_description(self, name, desc):
         dom = Domain()._load(str(os.path.join(DEFAULT_LOCATION, SYS_FOLDER_NAME, DOMAIN_DIR, name, Domain.METADATA)))
         dom._change_description(desc)
+        self.domains.invalidate(name)
         return dom.description
 
     # ==========CONFIGURATIONS============
@@ -363,15 +571,11 @@ class RESTManager():
         """
         Returns all data for a corresponding domain if it exists within the known mapping.
         """
-        res = list(filter(lambda d: d["name"] == name, self.map_memo))
-        print(res, name)
-        return (res[0] if len(res) > 0 else None, self.map_memo[self.map_memo.index(res[0])])
+        conf = self.configurations.get(name)
+        return (conf, conf)
 
     def list_all_configuration_names(self):
-        res = []
-        for log in self.map_memo:
-            res.append(log["name"])
-        return res
+        return list(self.configurations.entries)
 
     def new_configuration(self, name, domain, description, icon="bi bi-bezier2", content=""):
         """
@@ -388,9 +592,8 @@ class RESTManager():
 
         with open(file_path, "w+") as f:
             f.write(content)
-        self.map_memo.append({"name": name, "domain": domain, "icon": icon, "description": description})
-        self._save_mapping()
-        return (True, {"name": name, "domain": domain, "icon": icon, "description": description})
+        conf = self.configurations.add({"name": name, "domain": domain, "icon": icon, "description": description})
+        return (True, dict(conf))
 
     def rename_configuration(self, name, new_name):
         log, config = self.get_configuration_by_name(name)
@@ -405,26 +608,20 @@ class RESTManager():
         if not os.path.isfile(new_path):
             return (False, "There was a problem renaming the configuration.")
 
-        self.map_memo[self.map_memo.index(log)]["name"] = new_name
-        self._save_mapping()
-        return (True, self.map_memo)
+        return (True, self.configurations.rename(name, new_name))
 
     def change_icon(self, name, icon):
         log, config = self.get_configuration_by_name(name)
         if log is None:
             return (False, "Configuration does not exist.")
 
-        self.map_memo[self.map_memo.index(log)]["icon"] = icon
-        self._save_mapping()
-        return (True, self.map_memo)
+        return (True, self.configurations.update(name, icon=icon))
 
     def change_configuration_description(self, name, desc):
         log, config = self.get_configuration_by_name(name)
         if log is None:
             return (False, "Configuration does not exist.")
-        self.map_memo[self.map_memo.index(log)].update({"description": desc})
-        self._save_mapping()
-        return (True, self.map_memo)
+        return (True, self.configurations.update(name, description=desc))
 
     def delete_configuration(self, name):
         log, config = self.get_configuration_by_name(name)
@@ -433,10 +630,8 @@ class RESTManager():
         f_path = os.path.join(self.configuration_path, name)
         os.remove(f_path)
         if not os.path.isfile(f_path):
-            self.map_memo.remove(config)
-            self._save_mapping()
+            self.configurations.delete(name)
             return (True, "File was removed.")
-        self._save_mapping()
         return (False, "There was a problem removing the file.")
 
 
@@ -0,0 +1,116 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+from collections import defaultdict
+
+from clingo.symbol import Symbol
+
+from ooasp.assumptions import AssumptionStore
+
+EDGE_STYLE = {"strokeWidth": 2, "stroke": "#00557C"}
+
+
+class GraphBuilder:
+    """
+    Builds the nodes and edges representing a configuration in the format required by the front-end.
+    The objects, associations and attribute values of the assumptions are kept in dictionaries updated
+    with every change of the assumptions, and the possibilities are indexed by object id once per set
+    of brave consequences, so building the graph is a single pass over the objects and associations.
+    """
+
+    def __init__(self) -> None:
+        # class of each object by id
+        self.nodes = {}
+        # association assumptions by edge id
+        self.edges = {}
+        # value assumed for each object id and attribute name
+        self.active_values = {}
+        # increased with every change of the assumptions
+        self.revision = 0
+        self._possibilities = None
+        self._index = None
+
+    def attach(self, assumptions: AssumptionStore) -> None:
+        """
+        Rebuilds the graph from a store of assumptions and follows its changes.
+        """
+        self.nodes.clear()
+        self.edges.clear()
+        self.active_values.clear()
+        self.revision += 1
+        for assumption in assumptions:
+            self.update(True, assumption)
+        assumptions.listeners.append(self.update)
+
+    def update(self, added: bool, assumption: Symbol) -> None:
+        """
+        Adds or removes an assumption from the graph, called by the store of assumptions for every change.
+        """
+        self.revision += 1
+        name = assumption.name
+        if name == "ooasp_isa":
+            cls, o_id = map(str, assumption.arguments)
+            if added:
+                self.nodes[o_id] = cls
+            elif self.nodes.get(o_id) == cls:
+                del self.nodes[o_id]
+        elif name == "ooasp_associated":
+            assoc, source, target = map(str, assumption.arguments)
+            edge_id = f"{assoc}-{source}-{target}"
+            if added:
+                self.edges[edge_id] = (assoc, source, target)
+            else:
+                self.edges.pop(edge_id, None)
+        elif name == "ooasp_attr_value":
+            attr, o_id, value = map(str, assumption.arguments)
+            if added:
+                self.active_values[(o_id, attr)] = value
+            elif self.active_values.get((o_id, attr)) == value:
+                del self.active_values[(o_id, attr)]
+
+    def index(self, possibilities: dict) -> tuple[dict, dict, dict]:
+        """
+        Returns the values of each attribute, the associations and the violations of the possibilities by object id.
+        The index is kept until other possibilities are given.
+        """
+        if self._possibilities is possibilities:
+            return self._index
+        attributes = defaultdict(dict)
+        for attr in possibilities["attrs"]:
+            attributes[attr["object_id"]].setdefault(attr["name"], set()).add(attr["value"])
+        assocs = defaultdict(list)
+        for assoc in possibilities["associations"]:
+            assocs[assoc["from"]].append(assoc)
+        violations = defaultdict(list)
+        for vio in possibilities["violations"]:
+            violations[vio["object_id"]].append(vio)
+        self._possibilities = possibilities
+        self._index = (attributes, assocs, violations)
+        return self._index
+
+    def build(self, possibilities: dict) -> dict:
+        """
+        Returns the nodes and edges of the current assumptions, with the attributes, associations
+        and violations of each object taken from the possibilities.
+        """
+        attributes, assocs, violations = self.index(possibilities)
+        nodes = []
+        for o_id, cls in self.nodes.items():
+            data = {
+                "class": cls,
+                "object_id": o_id,
+                "attributes": [
+                    {"name": name, "values": set(values), "active_value": self.active_values.get((o_id, name)), "object_id": o_id}
+                    for name, values in attributes.get(o_id, {}).items()
+                ],
+                "assocs": list(assocs.get(o_id, ())),
+            }
+            if o_id in violations:
+                data["violations"] = list(violations[o_id])
+            nodes.append({"id": o_id, "type": "cstNode", "position": {"x": 0, "y": 0}, "data": data})
+        edges = [
+            {"id": edge_id, "assoc": assoc, "source": source, "target": target, "type": "smoothstep",
+             "style": dict(EDGE_STYLE), "data": {"label": assoc}, "label": assoc}
+            for edge_id, (assoc, source, target) in self.edges.items()
+        ]
+        return {"nodes": nodes, "edges": edges}
@@ -48,6 +48,9 @@ class InitData(BaseModel):
     objects: str = ""
     prio_associations: str = ""
     domain: str = str(os.path.join("examples", "racks", "kb.lp"))
+    time_limit: float | None = None
+    max_objects: int | None = None
+    max_atoms: int | None = None
 
 
 class DomainModel(BaseModel):
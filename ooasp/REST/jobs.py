@@ -0,0 +1,177 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from ooasp.REST.sessions import Session, current_session
+from ooasp.smart_ooasp import BudgetExceeded, SolveCancelled, Unsatisfiable
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+BUDGET_EXCEEDED = "budget_exceeded"
+UNSAT = "unsat"
+
+
+class Job:
+    """
+    A call to the solver of a session run in the background by the job queue.
+    """
+
+    def __init__(self, kind: str, session: Session, target) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.session = session
+        self.target = target
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind}, {self.status})"
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds the job has been running, 0 if it has not started.
+        """
+        if self.started is None:
+            return 0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def progress(self) -> dict:
+        """
+        Progress of the solver of the session while the job is running.
+        """
+        if self.status != RUNNING:
+            return {}
+        return dict(self.session.solver.progress)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "elapsed": round(self.elapsed, 3),
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Queue of jobs run by a fixed number of worker threads.
+    A job holds the lock of its session while it runs, so the jobs of a session run one after the other
+    while a waiting job does not keep a worker from running the jobs of other sessions.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 100) -> None:
+        """
+        Args:
+            max_workers (int): Maximum number of jobs running at the same time
+            max_finished (int): Number of finished jobs kept to be queried
+        """
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.pending = []
+        self.workers = []
+        self._condition = threading.Condition()
+
+    def submit(self, kind: str, session: Session, target) -> Job:
+        """
+        Queues a job calling target, which is run with the session as current session.
+        """
+        job = Job(kind, session, target)
+        with self._condition:
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self._prune()
+            if len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self._condition.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        return self.jobs.get(job_id)
+
+    def of_session(self, session: Session) -> list[Job]:
+        return [job for job in self.jobs.values() if job.session is session]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued or running job. Returns False if the job does not exist or has already finished.
+        A running job is cancelled through its solver and is marked as cancelled once the solver stopped.
+        """
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in (QUEUED, RUNNING):
+                return False
+            if job.status == QUEUED:
+                self.pending.remove(job)
+                job.status = CANCELLED
+                job.finished = time.time()
+                return True
+            job.cancel_requested = True
+            job.session.solver.cancel()
+            return True
+
+    def _next(self) -> Job:
+        while True:
+            for job in self.pending:
+                if job.session.lock.acquire(blocking=False):
+                    self.pending.remove(job)
+                    job.status = RUNNING
+                    job.started = time.time()
+                    job.session.events.publish("job", job.to_dict())
+                    return job
+            self._condition.wait()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next()
+            try:
+                current_session.set(job.session)
+                with job.session.solver_lock, job.session.solver.cancellable():
+                    # the job may have been cancelled before the solver started listening
+                    if job.cancel_requested:
+                        raise SolveCancelled()
+                    job.result = job.target()
+                job.status = DONE
+            except SolveCancelled:
+                job.status = CANCELLED
+            except BudgetExceeded as e:
+                job.status = TIMEOUT if e.reason == "timeout" else BUDGET_EXCEEDED
+                job.error = str(e)
+            except Unsatisfiable as e:
+                job.status = UNSAT
+                job.error = str(e)
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+                job.session.events.publish("job", job.to_dict())
+                with self._condition:
+                    job.session.lock.release()
+                    self._condition.notify_all()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status not in (QUEUED, RUNNING)]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
@@ -0,0 +1,236 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import itertools
+import os
+import threading
+import time
+
+from ooasp.assumptions import AssumptionStore
+from ooasp.config_format import LOG_SUFFIX, file_hash, format_changes, is_config, load_facts, log_header, save_facts
+
+
+class ChangeTracker:
+    """
+    Changes of the assumptions of a session since they were saved to a file, so that the next save
+    of the same file only appends them to its log of changes.
+    """
+
+    def __init__(self) -> None:
+        # file holding the assumptions without the changes, None if unknown
+        self.path = None
+        self.changes = []
+
+    def attach(self, assumptions: AssumptionStore) -> None:
+        """
+        Follows the changes of a store of assumptions, which has not been saved yet.
+        """
+        self.reset()
+        assumptions.listeners.append(self.update)
+
+    def update(self, added, assumption) -> None:
+        if self.path is not None:
+            self.changes.append((added, assumption))
+
+    def reset(self) -> None:
+        """
+        Forgets the file, so that the next save writes all assumptions.
+        """
+        self.path = None
+        self.changes = []
+
+    def saved(self, path: str) -> None:
+        """
+        Marks all assumptions as saved to a file.
+        """
+        self.path = str(path)
+        self.changes = []
+
+    def take(self, path: str):
+        """
+        Returns the changes since the assumptions were saved to a file, and marks them as saved.
+        Returns None if the assumptions were not saved to this file.
+        """
+        if self.path != str(path):
+            return None
+        changes, self.changes = self.changes, []
+        return changes
+
+
+class _Target:
+    """
+    State of the saves of one file: the latest save waiting to be written and the last version written.
+    """
+
+    def __init__(self) -> None:
+        # facts and format of a save of all facts, None if only changes are waiting
+        self.pending = None
+        # changes waiting to be appended to the log, after the pending facts if there are some
+        self.changes = []
+        self.version = 0
+        self.persisted = 0
+        self.error = None
+        self.worker = None
+        # hash and size of the file written last, and size of its log
+        self.digest = None
+        self.size = 0
+        self.log_size = 0
+
+    @property
+    def waiting(self) -> bool:
+        return self.pending is not None or bool(self.changes)
+
+
+class SaveQueue:
+    """
+    Writes configurations to their files in the background, with one worker thread per file.
+    A save replaces the save of the same file waiting to be written, so a burst of saves writes the file
+    once with the latest state. Files are written to a temporary file which is synced and renamed over the
+    file, so a file is never left half written and two saves never write the same file at the same time.
+    Changes of a file written by the queue can also be appended to its log of changes, see ooasp.config_format.
+    The file is rewritten with the changes once its log is larger than the file.
+    Every save gets a version, increasing over all files, and the last version written to each file is kept.
+    """
+
+    def __init__(self, delay: float = 0.1, idle_timeout: float = 30, min_log_size: int = 65536) -> None:
+        """
+        Args:
+            delay (float): Seconds a worker waits for more saves before writing
+            idle_timeout (float): Seconds after which the worker of a file without saves stops
+            min_log_size (int): Size in bytes up to which the log of a file is not compacted
+        """
+        self.delay = delay
+        self.idle_timeout = idle_timeout
+        self.min_log_size = min_log_size
+        self.targets = {}
+        self._versions = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def submit(self, path: str, facts, compact: bool = None) -> int:
+        """
+        Queues a save of facts to a file and returns its version.
+
+        Args:
+            path (str): The file
+            facts (Iterable[Symbol] | Callable[[], Iterable[Symbol]]): The facts, or a function returning them
+                which is only called if the save is written
+            compact (bool, optional): Whether to write the compact format, see save_facts
+        """
+        return self._queue(str(path), (facts, compact), [])
+
+    def append(self, path: str, changes: list) -> int:
+        """
+        Queues changes given as (added, fact) to be appended to the log of a file, and returns their version.
+        The file must have been saved with submit before.
+        """
+        return self._queue(str(path), None, changes)
+
+    def _queue(self, path: str, facts, changes: list) -> int:
+        with self._condition:
+            target = self.targets.setdefault(path, _Target())
+            version = next(self._versions)
+            target.version = version
+            if facts is not None:
+                target.pending = facts
+                target.changes = list(changes)
+            else:
+                target.changes.extend(changes)
+            if target.worker is None:
+                target.worker = threading.Thread(target=self._work, args=(path, target), daemon=True)
+                target.worker.start()
+            self._condition.notify_all()
+        return version
+
+    def version(self, path: str) -> int:
+        """
+        Returns the version of the last save of a file, 0 if it was never saved.
+        """
+        target = self.targets.get(str(path))
+        return 0 if target is None else target.version
+
+    def persisted(self, path: str) -> int:
+        """
+        Returns the version of the last save written to a file, 0 if none was written.
+        """
+        target = self.targets.get(str(path))
+        return 0 if target is None else target.persisted
+
+    def error(self, path: str) -> str:
+        """
+        Returns the error of the last save of a file that could not be written, None if it was written.
+        """
+        target = self.targets.get(str(path))
+        return None if target is None else target.error
+
+    def wait(self, path: str, version: int = None, timeout: float = None) -> bool:
+        """
+        Waits until a version of a file, by default the latest, is written or replaced by a newer written version.
+        Returns False if the timeout expired or the save failed.
+        """
+        target = self.targets.get(str(path))
+        if target is None:
+            return True
+        with self._condition:
+            version = target.version if version is None else version
+            self._condition.wait_for(lambda: target.persisted >= version or (target.error is not None
+                                                                             and not target.waiting), timeout)
+            return target.persisted >= version
+
+    def _work(self, path: str, target: _Target) -> None:
+        while True:
+            with self._condition:
+                if not target.waiting and not self._condition.wait_for(lambda: target.waiting, self.idle_timeout):
+                    target.worker = None
+                    return
+            # saves arriving in the meantime replace this one
+            time.sleep(self.delay)
+            with self._condition:
+                version, pending, changes = target.version, target.pending, target.changes
+                target.pending, target.changes = None, []
+                target.error = None
+            try:
+                if pending is not None:
+                    facts, compact = pending
+                    self._write(path, target, facts() if callable(facts) else facts, compact)
+                if changes:
+                    self._append(path, target, changes)
+                    if target.log_size > max(self.min_log_size, target.size):
+                        self._write(path, target, load_facts(path), None)
+                error = None
+            except Exception as e:
+                error = str(e)
+            with self._condition:
+                if error is None:
+                    target.persisted = version
+                target.error = error
+                self._condition.notify_all()
+
+    @staticmethod
+    def _write(path: str, target: _Target, facts, compact: bool) -> None:
+        if compact is None:
+            compact = os.path.exists(path) and is_config(path)
+        tmp_path = f"{path}.tmp"
+        save_facts(tmp_path, facts, compact)
+        fd = os.open(tmp_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        target.digest = file_hash(tmp_path)
+        target.size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        # the log belongs to the previous content of the file and would be ignored, it is removed
+        if os.path.exists(path + LOG_SUFFIX):
+            os.remove(path + LOG_SUFFIX)
+        target.log_size = 0
+
+    @staticmethod
+    def _append(path: str, target: _Target, changes: list) -> None:
+        text = format_changes(changes)
+        if target.log_size == 0:
+            text = log_header(path, target.digest) + text
+        with open(path + LOG_SUFFIX, "a" if target.log_size else "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        target.log_size += len(text)
@@ -0,0 +1,167 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from ooasp.REST.events import EventBroker
+from ooasp.REST.graph import GraphBuilder
+from ooasp.REST.persistence import ChangeTracker
+from ooasp.REST.state import StateHistory
+from ooasp.smart_ooasp import SmartOOASPSolver
+
+SESSION_HEADER = "X-Session-Id"
+DEFAULT_SESSION = "default"
+
+
+class Session:
+    """
+    State of one client of the REST API: its solver, the loaded domain and configuration, the lock
+    held while the solver is busy with a job, the lock held by every call to the solver, the broker passing
+    the events of the solver to the clients, the graph of its configuration, the versions of the state sent
+    to the front-end and the changes not saved yet.
+    """
+
+    def __init__(self, session_id: str, solver: SmartOOASPSolver) -> None:
+        self.session_id = session_id
+        self.events = EventBroker()
+        self.graph = GraphBuilder()
+        self.state = StateHistory()
+        self.changes = ChangeTracker()
+        self.solver = solver
+        self.lock = threading.Lock()
+        # held by jobs and requests while they use the solver, reentrant since requests call each other
+        self.solver_lock = threading.RLock()
+        self.last_access = time.time()
+
+        self.setup_flag = False
+        # catalog of the knowledge base of the selected domain
+        self.kb = None
+        self.specializations = {}
+        self.active_objects = []
+        self.allowed_objects = []
+        self.allowed_associations = {}
+        self.allowed_attributes = []
+        self.selected_domain = None
+        self.selected_domain_name = None
+        self.open_configuration_file = None
+        self.open_configuration_file_name = None
+        self.validity_check = False
+        self.cv_check = False
+        self.save_status = False
+        # brave consequences and the possibilities built from them
+        self.possibilities = None
+
+    def __repr__(self):
+        return f"Session({self.session_id})"
+
+    @property
+    def solver(self) -> SmartOOASPSolver:
+        return self._solver
+
+    @solver.setter
+    def solver(self, solver: SmartOOASPSolver) -> None:
+        self._solver = solver
+        solver.event_listener = self.events.publish
+        self.graph.attach(solver.assumptions)
+        self.changes.attach(solver.assumptions)
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while a job of the session is running.
+        """
+        return self.lock.locked()
+
+    @property
+    def size(self) -> int:
+        """
+        Size of the session used for the memory budget: the number of atoms grounded by its solver.
+        The count stored by the solver is read, so that the control is not touched while another thread uses it.
+        """
+        return self.solver.atoms
+
+
+class SessionPool:
+    """
+    Sessions by id, created on first use and evicted once they have been idle for too long,
+    or in least recently used order when there are too many sessions or their solvers grounded too many atoms.
+    Busy sessions are never evicted.
+    """
+
+    def __init__(self, factory, max_sessions: int = 16, idle_timeout: float = 1800, max_atoms: int = 5000000):
+        """
+        Args:
+            factory (Callable[[], SmartOOASPSolver]): Creates the solver of a new session
+            max_sessions (int): Maximum number of sessions kept
+            idle_timeout (float): Seconds after which an idle session is evicted
+            max_atoms (int): Maximum number of atoms grounded by the solvers of all sessions
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_atoms = max_atoms
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def new_id(self) -> str:
+        """
+        Returns a new unused session id.
+        """
+        return uuid.uuid4().hex
+
+    def get(self, session_id: str) -> Session:
+        """
+        Returns the session with the given id, creating it if it does not exist.
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.factory())
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            session.last_access = time.time()
+            self._evict()
+            return session
+
+    def reset(self, session: Session) -> None:
+        """
+        Replaces the solver of a session with a new one.
+        """
+        session.solver = self.factory()
+
+    def close(self, session_id: str) -> bool:
+        """
+        Removes a session. Returns False if it does not exist or is busy.
+        """
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None or session.busy:
+                return False
+            del self.sessions[session_id]
+            return True
+
+    def _evict(self) -> None:
+        now = time.time()
+        for session_id, session in list(self.sessions.items()):
+            if now - session.last_access > self.idle_timeout and not session.busy:
+                del self.sessions[session_id]
+        sizes = {session_id: session.size for session_id, session in self.sessions.items()}
+        total = sum(sizes.values())
+        # The most recently used session is the last one and is kept
+        for session_id, session in list(self.sessions.items())[:-1]:
+            if session.busy:
+                continue
+            if len(self.sessions) <= self.max_sessions and total <= self.max_atoms:
+                break
+            del self.sessions[session_id]
+            total -= sizes[session_id]
+
+
+current_session: ContextVar[Session] = ContextVar("current_session")
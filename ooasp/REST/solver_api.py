@@ -2,42 +2,61 @@
 # SPDX-License-Identifier: MIT
 
 import shutil
-from ooasp.smart_ooasp import SmartOOASPSolver
+from ooasp.smart_ooasp import SmartOOASPSolver, BudgetExceeded, SolveCancelled, Unsatisfiable
+from ooasp.REST.sessions import SessionPool, current_session, DEFAULT_SESSION
+from ooasp.REST.jobs import JobQueue, CANCELLED, UNSAT
+from ooasp.REST.persistence import SaveQueue
+from ooasp.REST.events import sse
+from ooasp.extraction import extract
+from ooasp.catalog import kb_catalog
+from ooasp.config_format import load_facts
 from interfaces import *
 from ooasp.REST.file_manager.ProjectManagerInterface import *
-from fastapi import FastAPI, UploadFile, File, Form, status
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, Header, Depends, Request, status
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response as PlainResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Annotated, List
-from clingo import Control, Function, parse_term
-import threading
+from typing import Annotated, List, Union
+from clingo import Function, parse_term
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import asyncio
 
 import os
-import copy
-
-global solver, setup_flag, st, allowed_objects, allowed_associations, allowed_attributes, selected_domain
-global solve_semaphore, active_objects, specializations, open_configuration_file, save_status, selected_domain_name, open_configuration_file_name
 
 FE_ORIGINS = ['http://localhost:5173']
 
 SMART_FUNCTIONS = ["association_possible", "assoc_needs_object", "global_lb_gap", "global_ub_gap"]
+# consequences are kept on disk to be reused after a restart of the server
+CACHE_DIR = os.path.join(".", "interactive_configurator_files", "cache")
+# maximum size in bytes of the consequences kept on disk, the least recently used ones are removed first
+CACHE_DISK_SIZE = 256 * 1024 * 1024
+# maximum number of solver jobs running at the same time over all sessions
+MAX_JOBS = 2
+# maximum number of requests of async routes using a solver at the same time over all sessions
+SOLVER_THREADS = 4
+
+
+def new_solver():
+    # domain sizes are not solved in parallel, requests of the sessions do not start worker processes
+    return SmartOOASPSolver(smart_generation_functions=SMART_FUNCTIONS, cache_dir=CACHE_DIR,
+                            cache_disk_size=CACHE_DISK_SIZE, parallel_sizes=0)
+
+
+# every client works on its own solver, selected with the X-Session-Id header
+sessions = SessionPool(new_solver)
+jobs = JobQueue(max_workers=MAX_JOBS)
+# async routes call the solver in these threads, so that the event loop is not blocked while the solver works
+solver_threads = ThreadPoolExecutor(max_workers=SOLVER_THREADS, thread_name_prefix="solver")
+# configurations are written to their files in the background, one writer per file
+saves = SaveQueue()
+
+
+async def bind_session(x_session_id: Annotated[Union[str, None], Header()] = None, session: Union[str, None] = None):
+    # the session can also be given as query parameter, since EventSource can not send headers
+    current_session.set(sessions.get(x_session_id or session or DEFAULT_SESSION))
 
-specializations = {}
-active_objects = []
-open_configuration_file = None
-solve_semaphore = False
-solver = SmartOOASPSolver(smart_generation_functions=SMART_FUNCTIONS)
-setup_flag = False
-allowed_objects = []
-allowed_associations = {}
-allowed_attributes = []
-selected_domain = None
-selected_domain_name = None
-open_configuration_file_name = None
-validity_check = False
-cv_check = False
-
-save_status = False
 
 app = MyAPI()
 app.add_middleware(  # allows connection in the development environment
@@ -47,129 +66,122 @@ app.add_middleware(  # allows connection in the development environment
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.router.dependencies.append(Depends(bind_session))
 
 # ==========FUNCTIONS===========
 
 
+async def in_solver_thread(fn, *args):
+    """
+    Calls a function using the solver of the current session in one of the solver threads,
+    holding the solver lock of the session, and waits for its result without blocking the event loop.
+    """
+    session = current_session.get()
+    context = contextvars.copy_context()
+
+    def call():
+        with session.solver_lock:
+            return fn(*args)
+
+    return await asyncio.get_running_loop().run_in_executor(solver_threads, context.run, call)
+
+
+def holding_solver(route):
+    """
+    Holds the solver lock of the current session during a route that is not async.
+    These routes are already run by FastAPI in its thread pool. While a job of the session is running,
+    they return 503 instead of keeping a thread of the pool waiting for the job, unless they are called by the job.
+    """
+    @functools.wraps(route)
+    def wrapper(*args, **kwargs):
+        session = current_session.get()
+        if not session.solver_lock.acquire(blocking=False):
+            if session.busy:
+                return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+            session.solver_lock.acquire()
+        try:
+            return route(*args, **kwargs)
+        finally:
+            session.solver_lock.release()
+    return wrapper
+
+
 def save():
-    global solver, solve_semaphore, save_status, open_configuration_file
-    if solve_semaphore:
+    session = current_session.get()
+    if session.busy:
         return "Solver is busy."
-    if open_configuration_file is None:
-        save_status = False
+    if session.open_configuration_file is None:
+        session.save_status = False
         return "No file is opened."
 
-    export_as_file(open_configuration_file)
-    save_status = True
+    # only the changes are appended to the log of the file once it has been saved
+    changes = session.changes.take(session.open_configuration_file)
+    if changes is None:
+        saves.submit(session.open_configuration_file, list(session.solver.assumptions))
+        session.changes.saved(session.open_configuration_file)
+    elif changes:
+        saves.append(session.open_configuration_file, changes)
+    session.save_status = True
 
 
 def import_solution(f_path: str = "fe_model.lp") -> None:
     """
     Takes a file containing a configuration encoding and loads it into the editor.
+    The facts are read from the file without solving, and the current solver is reused when possible,
+    so that only the objects that differ are grounded.
     """
-    global solver
+    session = current_session.get()
+    session.save_status = False
+    session.validity_check = False
     f_path = f_path.strip(
         '"'
     )
-    reset_solver()
-    ctl = Control(["1"])
-    ctl.load(f_path)
-    ctl.ground([("base", [])])
-    model = None
+    assumptions = load_facts(f_path)
     objects = {}
-    assumptions = []
-    with ctl.solve(yield_=True) as handle:
-        for model in handle:
-            for atom in model.symbols(atoms=True):
-                assumptions.append(str(atom))
-                if atom.match("ooasp_isa", 2):
-                    atom.arguments
-                    objects[atom.arguments[1].number] = atom.arguments[0].name
-            model = model.symbols(atoms=True)
-    objects = dict(sorted(objects.items(), key=lambda x: x[0]))
-    for expected_next_id, c in objects.items():
-        while expected_next_id > solver.next_id:
-            solver.add_object("object", must_be_used=False)
-        solver.add_object(c, must_be_used=True)
-    for a in assumptions:
-        solver.assumptions.add(str(parse_term(a)))
+    for atom in assumptions:
+        if atom.match("ooasp_isa", 2):
+            objects[atom.arguments[1].number] = atom.arguments[0].name
+    try:
+        session.solver.set_configuration(objects, assumptions)
+    except ValueError:
+        reset_solver()
+        session.solver.set_configuration(objects, assumptions)
 
 
 def load_known_names():
-    global allowed_objects, solver
-    allowed_objects = []
-    for fact in solver.model:
-        try:
-            f, v = fact.split("(")
-            if f == "ooasp_leafclass":
-                allowed_objects.append(v[0:-2])
-        except:
-            continue
-    return Response("Allowed Names.", data=allowed_objects)
+    session = current_session.get()
+    session.allowed_objects = list(session.kb.leafclasses)
+    return Response("Allowed Names.", data=session.allowed_objects)
 
 
 def load_specializations():
-    global specializations, solver
-    for fact in solver.model:
-        if "ooasp_assoc_specialization" in fact:
-            print(fact)
-            sub, sup = fact.split("(")[1].split(",")
-            print(sub, sup)
-            if sup[0:-2] in specializations.keys():
-                specializations[sup[0:-2]].append(sub)
-            else:
-                specializations.update({sup[0:-2]: [sub]})
-    return specializations
+    session = current_session.get()
+    session.specializations = dict(session.kb.specializations)
+    return session.specializations
 
 
 def load_known_associations():
-    global allowed_associations, solver
-    allowed_associations = {}
-    for fact in solver.model:
-        if "%" in fact:
-            continue
-        if "ooasp_assoc(" in fact:
-            contents = fact.split("(")
-            assoc_info = contents[1].replace(")", "").replace(".", "").split(",")
-            allowed_associations.update({
-                assoc_info[0]: {
-                    "from": assoc_info[1],
-                    "fromMin": assoc_info[2],
-                    "fromMax": assoc_info[3],
-                    "to": assoc_info[4],
-                    "toMin": assoc_info[5],
-                    "toMax": assoc_info[6]
-                }
-            })
-    return Response("Allowed Associations.", data=allowed_associations)
+    session = current_session.get()
+    session.allowed_associations = dict(session.kb.associations)
+    return Response("Allowed Associations.", data=session.allowed_associations)
 
 
 def load_known_attributes():
-    global allowed_attributes, solver
-    for fact in solver.model:
-        if "ooasp_attr(" in fact:
-            stripped = fact.split("(")[1][0:-2]
-            class_name, attr, attr_type = stripped.split(",")
-            allowed_attributes.append({"class": class_name, "attribute": attr, "type": attr_type})
-    return Response("Attributes.", data=allowed_objects)
+    session = current_session.get()
+    session.allowed_attributes = session.kb.attribute_list
+    return Response("Attributes.", data=session.allowed_objects)
 
 
 def parse_model(m):
     """
-    parses the model and only returns load-relevant facts.
+    parses the model symbols and only returns load-relevant facts as symbols.
     """
-    res = []
-    for fact in m:
-        if "ooasp_isa_leaf" in fact:
-            new_fact = "ooasp_isa("+fact.split("(")[1]
-            res.append(new_fact)
-        if "ooasp_attr_value" in fact:
-            res.append(fact)
-        if "ooasp_associated" in fact:
-            assoc_data = fact.split("(")
-            name, t1, t2 = assoc_data[-1].split(",")
-            if name not in specializations.keys():  # if there does not exist a specialisation it is the leaf
-                res.append(fact)
+    session = current_session.get()
+    model = extract(m)
+    res = [Function("ooasp_isa", o.symbol.arguments) for o in model.leaf_objects]
+    res += [a.symbol for a in model.attribute_values]
+    # if there does not exist a specialisation it is the leaf
+    res += [a.symbol for a in model.associations if a.name not in session.specializations]
     return res
 
 
@@ -177,6 +189,7 @@ def parse_assumptions(a):
     """
     parses the model and only returns load-relevant facts.
     """
+    session = current_session.get()
     res = []
     for fact in a:
         if "ooasp_isa" in fact:
@@ -186,73 +199,49 @@ def parse_assumptions(a):
         if "ooasp_associated" in fact:
             assoc_data = fact.split("(")
             name, t1, t2 = assoc_data[-1].split(",")
-            if name not in specializations.keys():  # if there does not exist a specialisation it is the leaf
+            if name not in session.specializations.keys():  # if there does not exist a specialisation it is the leaf
                 res.append(f"{fact}.")
     return res
 
 
-def initialise_solver(solver, data):
-    global selected_domain
-    selected_domain = os.path.split(data.domain)[0]
+def initialise_solver(session, data):
+    session.selected_domain = os.path.split(data.domain)[0]
 
     object_list = data.objects.split(",") if data.objects != "" else []
     data.prio_associations = data.prio_associations.split(",")
-    solver.ctl.load(data.domain)
-    solver.load_base()
-    solver.smart_complete()
-    # check if a model with domain info was created
-    if solver.model is None:
-        return Response(message="Initial domain solve failed.", data=None).build()
+    session.solver.time_limit = data.time_limit
+    session.solver.max_objects = data.max_objects
+    session.solver.max_atoms = data.max_atoms
+    # the knowledge base is read from its grounding, without solving
+    session.kb = kb_catalog(data.domain)
+    if not session.kb.classes:
+        return Response(message="The domain does not define any class.", data=None).build()
+    session.solver.load(data.domain)
+    session.solver.load_base()
 
-    solver.initial_objects = object_list
-    solver.associations_with_priority = data.prio_associations
+    session.solver.initial_objects = object_list
+    session.solver.associations_with_priority = data.prio_associations
 
-    solver.create_initial_objects()
+    session.solver.create_initial_objects()
 
-    global setup_flag
-    setup_flag = True
+    session.setup_flag = True
 
     load_known_associations()
     load_known_names()
     load_known_attributes()
     load_specializations()
-    # functions above can be consolidated into one in future to improve efficiency
 
-    return Response(message="Solver was initialised.", data=solver.__dict__).build()
+    return Response(message="Solver was initialised.", data=session.solver.__dict__).build()
 
 
-def _new_attr(node, attr):
-    global solver
-    found_val = None
-    for fact in solver.assumptions:
-        if "ooasp_attr_value" in fact:
-            val_info = fact.split("(")[-1].replace(")", "")
-            attr_name, target, value = val_info.split(",")
-            print(fact)
-            if (str(node["id"]) == str(target)) and (attr["name"] == attr_name):
-                found_val = value
-                break
-    vals = set()
-    vals.add(attr["value"])
-    attr_dict = {
-        "name": attr["name"],
-        "values": vals,
-        "active_value": found_val,
-        "object_id": node["id"]
-    }
-    for exisiting_attr in node["data"]["attributes"]:
-        if exisiting_attr["name"] == attr["name"] and exisiting_attr["object_id"] == node["id"]:
-            return
-
-    node["data"]["attributes"].append(attr_dict)
-    return
-
-
-def export_as_file(path):
-    global solver
-    with open(path, "w+") as f:
-        for assumption in solver.assumptions:
-            f.write(f"{assumption}.\n")
+def export_as_file(path, compact=None):
+    """
+    Saves the assumptions to a file and waits until it is written.
+    """
+    session = current_session.get()
+    version = saves.submit(path, list(session.solver.assumptions), compact)
+    session.changes.saved(path)
+    saves.wait(path, version)
 
 
 def represent_as_graph():
@@ -260,171 +249,55 @@ def represent_as_graph():
     Represents list of objects and associations a collection of nodes and edges.
     If the solver is busy, returns a placeholder node instead.
     Nodes are built in a format required by the front-end representation, including styling and placeholder positions.
+    The graph of the session follows the changes of the assumptions, see GraphBuilder.
     """
-    global solve_semaphore, cv_check
-    if solve_semaphore:
+    session = current_session.get()
+    if session.busy:
         return {"nodes": [{"id": "-1", "type": "wNode", "position": {"x": 150, "y": 150}, "data": {}}], "edges": []}
 
-    brave = get_possibilities()
-
-    data = {
-        "nodes": [],
-        "edges": []
-    }
-
-    global solver, active_objects
-    active_objects = []
-    known = list(solver.assumptions)
-    for assumption in known:
-        if "ooasp_isa(" in assumption:
-            data_list = assumption.replace(")", "").replace("ooasp_isa(", "").split(",")
-            active_objects.append(data_list[1])
-            node = {"id": data_list[1],
-                    "type": "cstNode",
-                    "position": {"x": 0, "y": 0},
-                    "data": {"class": data_list[0], "object_id": data_list[1], "attributes": [], "assocs": []}
-                    }
-            data["nodes"].append(node)
-        elif "ooasp_associated(" in assumption:
-            data_list = assumption.replace(")", "").replace("ooasp_associated(", "").split(",")
-            edge = {"id": str(data_list[0])+"-"+str(data_list[1])+"-"+str(data_list[2]), "assoc": data_list[0], "source": data_list[1], "target": data_list[2], "type": "smoothstep",
-                    "style": {
-                        "strokeWidth": 2,
-                        "stroke": "#00557C"
-            },
-                "data": {
-                        "label": data_list[0]
-            },
-                "label": data_list[0]
-            }
-            data["edges"].append(edge)
-
-        for attr in brave["attrs"]:
-            # possible optimisation of code here
-            if attr["object_id"] in active_objects:
-                for node in data["nodes"]:
-                    if node["id"] == attr["object_id"]:
-                        if len(node["data"]["attributes"]) <= 0:
-                            _new_attr(node, attr)
-
-                        else:
-                            for node_attribute in node["data"]["attributes"]:
-                                if attr["name"] == node_attribute["name"]:
-                                    node_attribute["values"].add(attr["value"])
-
-                                else:
-                                    _new_attr(node, attr)
-
-        for assoc in brave["associations"]:
-            if assoc["from"] in active_objects:
-                for node in data["nodes"]:
-                    if node["id"] == assoc["from"]:
-                        if assoc not in node["data"]["assocs"]:
-                            node["data"]["assocs"].append(assoc)
-        violation_count = 0
-        for vio in brave["violations"]:
-            if vio["object_id"] in active_objects:
-                for node in data["nodes"]:
-                    if node["id"] == vio["object_id"]:
-                        if "violations" not in node["data"].keys():
-                            node["data"].update({"violations": [vio]})
-                            violation_count += 1
-                        else:
-                            if vio not in node["data"]["violations"]:
-                                node["data"]["violations"].append(vio)
-                                violation_count += 1
-        if violation_count == 0:
-            cv_check = True
-        else:
-            cv_check = False
-
-    return data
+    session.active_objects = list(session.graph.nodes)
+    return session.graph.build(get_possibilities())
 
 
 def solve_threaded():
-    global solver, solve_semaphore, save_status, validity_check
-    save_status = False
-    solve_semaphore = True
-    print("Started solving")
-    solver.smart_complete()
-    new_assumptions = parse_model(solver.model)
-    solver.assumptions = set()
-    for fact in new_assumptions:
-        solver.assumptions.add(fact[0:-1])
+    """
+    Completes the configuration of the current session. Run as a job holding the lock of the session.
+    """
+    session = current_session.get()
+    session.save_status = False
+    with session.solver.journal_step():
+        session.solver.smart_complete()
+        new_assumptions = parse_model(session.solver.model_symbols)
+        session.solver.assumptions.clear()
+        for fact in new_assumptions:
+            session.solver.assumptions.add(fact)
     # this needs to be reset because we forcefully change assumptions
-    solver.brave = None
-    solver.cautious = None
-    validity_check = True
-    solve_semaphore = False
-    print("SOLVER:> Finished Solving!")
+    session.solver.brave = None
+    session.solver.cautious = None
+    session.validity_check = True
 
 
 def get_possibilities():
     """
-    Returns all possible changes in a dictionary format
+    Returns all possible changes in a dictionary format.
+    The result is kept until the brave consequences of the solver change.
     """
-    res = {"objects": [], "associations": [], "attrs": [], "smart_suggestions": [], "violations": []
-           }  # smart-suggestions currently do not have a pracical use, but might be useful in future
-    global solver, specializations, cv_check
-    brave = solver.get_brave()
-
-    for consq in brave:
-        try:
-            consq = str(consq)
-            if 'ooasp_isa(' in consq:
-                stripped = consq.split('(')[1][:-1]
-                divided = stripped.split(',')
-                res["objects"].append(
-                    {"id": divided[1], "class": divided[0]}
-                )
-            elif 'ooasp_associated(' in consq:
-                stripped = consq.split('(')[1][:-1]
-                divided = stripped.split(',')
-                res["associations"].append(
-                    {"from": divided[1],
-                     "to": divided[2],
-                     "assoc_name": divided[0]}
-                )
-            elif 'ooasp_attr_value(' in consq:
-                stripped = consq.split('(')[1][:-1]
-                divided = stripped.split(',')
-                res["attrs"].append(
-                    {"name": divided[0],
-                     "object_id": divided[1],
-                     "value": divided[2]}
-                )
-            else:
-                sf_name, data = consq.split("(")
-                data = tuple(data[:-1].split(","))
-                res["smart_suggestions"].append(
-                    {"smart_function": sf_name,
-                     "data": data}
-                )
-        except:
-            try:
-                divided = consq.split("(")
-                print(divided)
-                if divided[0] == "ooasp_cv":
-                    object_info = divided[1].split(",")
-                    message_args = divided[-1].split(",")
-                    message = list(zip(object_info[2].strip('"').split("{}"), message_args))
-                    message_str = ""
-                    for t in message[0:-1]:
-                        message_str += f"{t[0]}{t[1]}"
-                    violation = {
-                        "violation_name": object_info[0],
-                        "object_id": object_info[1],
-                        "message": message_str
-                    }
-                    if message_args[0] not in list(specializations.keys()):
-                        res["violations"].append(violation)
-            except:
-                continue
-            if len(res["violations"]) == 0:
-                cv_check = True
-            else:
-                cv_check = False
-
+    session = current_session.get()
+    brave = session.solver.get_brave()
+    if session.possibilities is not None and session.possibilities[0] is brave:
+        return session.possibilities[1]
+    consequences = extract(brave)
+    res = {
+        "objects": [{"id": o.id, "class": o.cls} for o in consequences.objects],
+        "associations": [{"from": a.source, "to": a.target, "assoc_name": a.name} for a in consequences.associations],
+        "attrs": [{"name": a.name, "object_id": a.object_id, "value": a.value} for a in consequences.attribute_values],
+        # smart-suggestions currently do not have a pracical use, but might be useful in future
+        "smart_suggestions": [{"smart_function": sf.function, "data": sf.args} for sf in consequences.suggestions],
+        "violations": [{"violation_name": v.name, "object_id": v.object_id, "message": v.message}
+                       for v in consequences.violations if not v.args or v.args[0] not in session.specializations],
+    }
+    session.cv_check = len(res["violations"]) == 0
+    session.possibilities = (brave, res)
     return res
 
 # ===========SYSTEM============("/system")
@@ -432,19 +305,23 @@ def get_possibilities():
 
 @app.get("/system/status")
 async def get_active_domain():
-    global selected_domain, open_configuration_file, save_status, selected_domain_name, validity_check, cv_check
-    return {"domain": selected_domain_name if selected_domain_name is not None else selected_domain,
-            "file": open_configuration_file_name if open_configuration_file_name is not None else open_configuration_file,
-            "save_status": save_status,
-            "validity_status": validity_check,
-            "constraints_status": cv_check}
+    session = current_session.get()
+    return {"domain": session.selected_domain_name if session.selected_domain_name is not None else session.selected_domain,
+            "file": session.open_configuration_file_name if session.open_configuration_file_name is not None else session.open_configuration_file,
+            "save_status": session.save_status,
+            "validity_status": session.validity_check,
+            "constraints_status": session.cv_check,
+            "save_version": saves.version(session.open_configuration_file),
+            "persisted_version": saves.persisted(session.open_configuration_file),
+            "save_error": saves.error(session.open_configuration_file)}
 
 # -----------System Checks------------("system/flags")
 
 
 @app.get("/system/flags/heartbeat")
 async def activity():
-    return Response(setup_flag, None).build()
+    session = current_session.get()
+    return Response(session.setup_flag, None).build()
 
 
 @app.get("/system/flags/pfm/instance_id")
@@ -456,63 +333,87 @@ def get_instance_id():
 
 @app.get("/system/data/active_ids")
 async def get_active_objects():
-    global active_objects
-    return Response("Active ids", active_objects).build()
+    session = current_session.get()
+    return Response("Active ids", session.active_objects).build()
 
 
 @app.get("/system/data/knowledgebase")
 async def show_loaded_kb():
-    global allowed_associations, allowed_objects, allowed_attributes
-    return Response("Known class names and associations.", {"classes": allowed_objects, "associations": allowed_associations, "attributes": allowed_attributes, "specializations": specializations})
+    session = current_session.get()
+    return Response("Known class names and associations.", {"classes": session.allowed_objects, "associations": session.allowed_associations, "attributes": session.allowed_attributes, "specializations": session.specializations})
 
 
 # -----------System Actions-----------("/system/actions")
 @app.post("/system/actions/reset_solver")
+@holding_solver
 def reset_solver():
-    global solver, selected_domain, save_status, validity_check
-    save_status = False
-    validity_check = False
-    solver = SmartOOASPSolver(smart_generation_functions=SMART_FUNCTIONS)
-    print(selected_domain)
-    initialise_solver(solver, InitData(objects="", prio_associations="", domain=selected_domain+"/kb.lp"))
-    Response("Current Solver state.", solver.__dict__).build()
+    session = current_session.get()
+    session.save_status = False
+    session.validity_check = False
+    # the budgets are kept for the new solver
+    budgets = {"time_limit": session.solver.time_limit, "max_objects": session.solver.max_objects,
+               "max_atoms": session.solver.max_atoms}
+    sessions.reset(session)
+    initialise_solver(session, InitData(objects="", prio_associations="", domain=session.selected_domain+"/kb.lp", **budgets))
+    Response("Current Solver state.", session.solver.__dict__).build()
 
 
 @app.post("/system/actions/initialise")
+@holding_solver
 def init_solver(values: InitData):
-    return initialise_solver(solver, values)
+    session = current_session.get()
+    return initialise_solver(session, values)
+
+
+@app.post("/system/sessions")
+async def create_session():
+    """
+    Returns a new session id to be sent by the client in the X-Session-Id header.
+    """
+    return Response("New session.", data=sessions.new_id()).build()
+
+
+@app.delete("/system/sessions/{session_id}")
+async def close_session(session_id):
+    if not sessions.close(session_id):
+        return Response("Session does not exist or is busy.", data=[]).build(code=status.HTTP_400_BAD_REQUEST)
+    return Response(f"Closed session: {session_id}.", data=[]).build()
 
 # -----------PG: File Management----------("/files")
 
 
 @app.post("/files/select/domain/{name}")
+@holding_solver
 def select_domain(name):
     """
     Select an domain and initialises a solver with it.
     """
-    global solver, selected_domain_name
+    session = current_session.get()
     path = os.path.join(app.pfm.domain_path, name, "kb.lp")
-    solver = SmartOOASPSolver(smart_generation_functions=SMART_FUNCTIONS)
-    initialise_solver(solver, InitData(objects="", prio_associations="", domain=path))
-    selected_domain_name = name
-    Response("Current Solver state.", solver.__dict__).build()
+    sessions.reset(session)
+    initialise_solver(session, InitData(objects="", prio_associations="", domain=path))
+    session.selected_domain_name = name
+    Response("Current Solver state.", session.solver.__dict__).build()
 
 
 @app.post("/files/select/configuration/{name}")
+@holding_solver
 def select_configuration(name):
     """
     Selects a file and considers it open.
     """
-    global selected_domain_name, save_status, open_configuration_file, open_configuration_file_name
+    session = current_session.get()
     map_log = app.pfm.get_configuration_by_name(name)[0]
-    if map_log["domain"] != selected_domain_name:
+    if map_log is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content="Configuration does not exist.")
+    if map_log["domain"] != session.selected_domain_name:
         select_domain(map_log["domain"])
 
     path = os.path.join(app.pfm.configuration_path, name)
     load_from_file(path)
-    save_status = True
-    open_configuration_file_name = name
-    return open_configuration_file
+    session.save_status = True
+    session.open_configuration_file_name = name
+    return session.open_configuration_file
 
 # ----------->DOMAINS<---------- ("/files/domains")
 
@@ -658,9 +559,7 @@ def delete_configuration(name):
 
 @app.post("/files/configurations/icon/{name}")
 def change_icon(name, icon_name: str):
-    log = app.pfm.get_configuration_by_name(name)
-    log[1]["icon"] = icon_name
-    app.pfm._save_mapping()
+    app.pfm.change_icon(name, icon_name)
     return JSONResponse(content=app.pfm.get_configuration_by_name(name))
 
 
@@ -676,17 +575,16 @@ def edit_configuration(name, data: ConfigurationUpdateModel):
         print(name, data.name)
         app.pfm.rename_configuration(name, data.name)
         name = data.name
-    print(app.pfm.map_memo)
     return JSONResponse(content=app.pfm.get_configuration_by_name(name))
 
 
 @app.put("/files/configurations/{name}/rename/{new_name}")
 def rename_configuration(name, new_name):
-    global open_configuration_file, open_configuration_file_name
+    session = current_session.get()
     response = app.pfm.rename_configuration(name, new_name)
     if response[0]:
-        open_configuration_file_name = new_name
-        open_configuration_file = Path(str(open_configuration_file).replace(name, new_name))
+        session.open_configuration_file_name = new_name
+        session.open_configuration_file = Path(str(session.open_configuration_file).replace(name, new_name))
     # make sure the name changes in the system as well (loaded name and path)
     return JSONResponse(status_code=status.HTTP_200_OK, content=app.pfm.get_configuration_by_name(new_name)[0])
 
@@ -697,36 +595,83 @@ def rename_configuration(name, new_name):
 
 @app.post("/configurator/save")
 async def request_save():
-    global solve_semaphore
-    if solve_semaphore:
+    session = current_session.get()
+    if session.busy:
         return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
-    save()
+    await in_solver_thread(save)
 
 
 @app.put("/configurator/add/{cls}")
 async def add_object(cls):
-    global solve_semaphore, save_status, validity_check
-    validity_check = False
-    save_status = False
-    if solve_semaphore:
+    session = current_session.get()
+    session.validity_check = False
+    session.save_status = False
+    if session.busy:
         return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-    global solver
-    solver.add_object(str(cls))
-    save()
-    return Response(f"Added object: {cls}.", data=str(solver.__dict__))
+    def add():
+        session.solver.add_object(str(cls), removable=True)
+        save()
+
+    await in_solver_thread(add)
+    return Response(f"Added object: {cls}.", data=str(session.solver.__dict__))
+
+
+@app.delete("/configurator/remove/{object_id}")
+async def remove_object(object_id):
+    session = current_session.get()
+    if session.busy:
+        return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    try:
+        await in_solver_thread(lambda: session.solver.remove_object(int(object_id)))
+    except ValueError as e:
+        return Response(str(e), data=[]).build(code=status.HTTP_400_BAD_REQUEST)
+    session.validity_check = False
+    session.save_status = False
+    await in_solver_thread(save)
+    return Response(f"Removed object: {object_id}.", data=str(session.solver.__dict__)).build()
+
+
+@app.post("/configurator/undo")
+async def undo():
+    session = current_session.get()
+    if session.busy:
+        return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if not await in_solver_thread(lambda: session.solver.undo()):
+        return Response("Nothing to undo.", data=[]).build(code=status.HTTP_400_BAD_REQUEST)
+    session.validity_check = False
+    session.save_status = False
+    await in_solver_thread(save)
+    return Response("Undone.", data=str(session.solver.assumptions)).build()
+
+
+@app.post("/configurator/redo")
+async def redo():
+    session = current_session.get()
+    if session.busy:
+        return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if not await in_solver_thread(lambda: session.solver.redo()):
+        return Response("Nothing to redo.", data=[]).build(code=status.HTTP_400_BAD_REQUEST)
+    session.validity_check = False
+    session.save_status = False
+    await in_solver_thread(save)
+    return Response("Redone.", data=str(session.solver.assumptions)).build()
 
 
 @app.post("/configurator/attribute/{name}/{target_id}/{value}")
+@holding_solver
 def assign_value(name, target_id, value):
-    global solver, solve_semaphore, save_status, validity_check
-    validity_check = False
-    save_status = False
-    if solve_semaphore:
+    session = current_session.get()
+    session.validity_check = False
+    session.save_status = False
+    if session.busy:
         return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
-    solver.choose_attribute_value((str(name), target_id, value))
+    session.solver.choose_attribute_value((str(name), target_id, value))
     save()
-    return Response("Succesfully added.", data=solver.assumption_list).build(code=status.HTTP_200_OK)
+    return Response("Succesfully added.", data=session.solver.assumption_list).build(code=status.HTTP_200_OK)
 
 
 @app.post("/configurator/associate/{id1}/{name}/{id2}")
@@ -734,51 +679,95 @@ async def associate(id1, id2, name):
     """
     Creates an association between two objects.
     """
-    global solve_semaphore, allowed_associations, save_status, validity_check
-    validity_check = False
-    save_status = False
-    if solve_semaphore:
+    session = current_session.get()
+    session.validity_check = False
+    session.save_status = False
+    if session.busy:
         return Response("Solver is currently busy.", data=[]).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-    global allowed_associations
-    if name not in allowed_associations.keys():
+    if name not in session.allowed_associations.keys():
+        await in_solver_thread(save)
+        return Response("This association is not defined in the domain's knowledgebase.", data=session.allowed_associations).build(code=status.HTTP_400_BAD_REQUEST)
+
+    def add():
+        session.solver.associate((name, int(id1), int(id2)))
         save()
-        return Response("This association is not defined in the domain's knowledgebase.", data=allowed_associations).build(code=status.HTTP_400_BAD_REQUEST)
+        return f"ooasp_associated({name},{id1},{id2})" in session.solver.assumptions
 
-    global solver
-    solver.associate((name, int(id1), int(id2)))
-    succ = f"ooasp_associated({name},{id1},{id2})" in solver.assumptions
-    save()
-    return Response("Succesfully added." if succ else "Error while adding.", data=solver.assumption_list).build(code=status.HTTP_200_OK if succ else status.HTTP_500_INTERNAL_SERVER_ERROR)
+    succ = await in_solver_thread(add)
+    return Response("Succesfully added." if succ else "Error while adding.", data=session.solver.assumption_list).build(code=status.HTTP_200_OK if succ else status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 # ----------->Configurator: data<----------
 @app.get("/configurator/state")
-async def all_information():
-    global solve_semaphore
-    res = {"state": {
-        "nodes": [{"id": "-1", "type": "wNode", "position": {"x": 150, "y": 150}, "data": {}}],
-        "edges": []
-    },
-        "brave": {}}if solve_semaphore else {"state": represent_as_graph(), "brave": get_possibilities()}
+async def all_information(since: Union[int, None] = None, if_none_match: Annotated[Union[str, None], Header()] = None):
+    """
+    Returns the graph of the configuration and the possibilities, together with the version of this state.
+    Given the version of a previous state as `since`, only the changes since that version are returned if it is
+    still kept. The version is also sent as ETag, and the response is empty if it matches If-None-Match.
+    """
+    session = current_session.get()
+    if session.busy:
+        return {"state": {
+            "nodes": [{"id": "-1", "type": "wNode", "position": {"x": 150, "y": 150}, "data": {}}],
+            "edges": []
+        },
+            "brave": {},
+            "version": session.state.version}
+
+    def state():
+        possibilities = get_possibilities()
+        version = session.state.update(session.graph.revision, possibilities, represent_as_graph)
+        headers = {"ETag": f'"{version}"'}
+        if if_none_match == headers["ETag"]:
+            return PlainResponse(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        res = session.state.delta(since) if since is not None else None
+        if res is None:
+            graph = session.state.latest.graph
+            res = {"state": graph, "brave": possibilities, "version": version}
+            if len(graph["nodes"]) == 0:
+                res["state"] = {"nodes": [{"id": "-2", "type": "startNode", "position": {"x": 150, "y": 150}, "data": {}}],
+                                "edges": graph["edges"]}
+
+        return JSONResponse(content=jsonable_encoder(res), headers=headers)
+
+    return await in_solver_thread(state)
+
+
+@app.get("/configurator/events")
+async def stream_events(request: Request):
+    """
+    Streams the events of the solver of the session as server-sent events: iterations, smart functions applied,
+    objects added, UNSAT steps, models found, timing snapshots and status changes of the jobs.
+    """
+    session = current_session.get()
 
-    if len(res["state"]["nodes"]) == 0:
-        res["state"]["nodes"].append({"id": "-2", "type": "startNode", "position": {"x": 150, "y": 150}, "data": {}})
+    async def events():
+        with session.events.subscribe() as queue:
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # keeps the connection open through proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse(event, data)
 
-    return (res)
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.get("/configurator/model")
 async def get_model():
-    global solver
-    m = solver.model
+    session = current_session.get()
+    m = session.solver.model
     msg = "No solution available." if m is None else "Current solution found."
-    return Response(msg, data=str(m)).build()
+    return Response(msg, data=await in_solver_thread(str, m)).build()
 
 
 @app.get("/configurator/brave/json")
 async def get_possibilities_ep():
-    pos = get_possibilities()
+    pos = await in_solver_thread(get_possibilities)
     return Response("Possible actions to be taken.", pos).build()
 
 # ----------->Solver<---------- ("/configurator/solver")
@@ -786,32 +775,83 @@ async def get_possibilities_ep():
 
 @app.post("/configurator/solver/solve")
 async def call_solve():
-    global solve_semaphore, solver
-    t1 = threading.Thread(target=solve_threaded)
-    t1.start()
-    print(solve_semaphore)
-    return Response("Generating a solution.", data=str(solver.model)).build()
+    session = current_session.get()
+    job = jobs.submit("solve", session, solve_threaded)
+    return Response("Generating a solution.", data=job.id).build()
+
+# ----------->Jobs<---------- ("/jobs")
+
+
+def _consequences_job(cautious):
+    session = current_session.get()
+    consequences = session.solver.get_cautious() if cautious else session.solver.get_brave()
+    return [str(s) for s in consequences]
+
 
+@app.post("/jobs/cautious")
+async def submit_cautious():
+    session = current_session.get()
+    job = jobs.submit("cautious", session, lambda: _consequences_job(True))
+    return Response("Queued job.", data=job.id).build()
+
+
+@app.post("/jobs/brave")
+async def submit_brave():
+    session = current_session.get()
+    job = jobs.submit("brave", session, lambda: _consequences_job(False))
+    return Response("Queued job.", data=job.id).build()
+
+
+@app.post("/jobs/import/{path}")
+async def submit_import(path):
+    session = current_session.get()
+    job = jobs.submit("import", session, lambda: load_configuration(path))
+    return Response("Queued job.", data=job.id).build()
+
+
+@app.get("/jobs")
+async def list_jobs():
+    session = current_session.get()
+    return Response("Jobs of the session.", data=[job.to_dict() for job in jobs.of_session(session)]).build()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id):
+    session = current_session.get()
+    job = jobs.get(job_id)
+    if job is None or job.session is not session:
+        return Response("Job does not exist.", data=[]).build(code=status.HTTP_404_NOT_FOUND)
+    return Response(f"Job {job.status}.", data=job.to_dict()).build()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id):
+    session = current_session.get()
+    job = jobs.get(job_id)
+    if job is None or job.session is not session or not jobs.cancel(job_id):
+        return Response("Job does not exist or has finished.", data=[]).build(code=status.HTTP_400_BAD_REQUEST)
+    return Response(f"Cancelling job: {job_id}.", data=[]).build()
 
 @app.post("/configurator/solver/load_template/{template_name}")
+@holding_solver
 def import_from_template(template_name):
-    global solve_semaphore, solver, selected_domain
-    if solve_semaphore:
+    session = current_session.get()
+    if session.busy:
         return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content="Solver is busy.")
-    import_solution(os.path.join(selected_domain, "templates", template_name))
+    import_solution(os.path.join(session.selected_domain, "templates", template_name))
     return
 
 
 @app.get("/configurator/solver/objects")
 async def get_all_objects():
-    global solver
-    return Response("Current objects.", data=str(solver.objects)).build()
+    session = current_session.get()
+    return Response("Current objects.", data=await in_solver_thread(lambda: str(session.solver.objects))).build()
 
 
 @app.get("/configurator/solver/assumptions")
 async def get_all_assumptions():
-    global solver
-    return Response("Current assumptions.", data=str(solver.assumptions)).build()
+    session = current_session.get()
+    return Response("Current assumptions.", data=await in_solver_thread(lambda: str(session.solver.assumptions))).build()
 
 
 @app.get("/configurator/solver/consequences/cautious")
@@ -820,8 +860,15 @@ async def get_cautious():
     Returns cautions consequences.
     These are things true in all models, meaning that these steps must be taken in order to get the result
     """
-    global solver
-    csq = str(solver.get_cautious()).split(",")
+    session = current_session.get()
+    try:
+        csq = str(await in_solver_thread(lambda: session.solver.get_cautious())).split(",")
+    except BudgetExceeded as e:
+        return Response(str(e), data=e.reason).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Unsatisfiable as e:
+        return Response(str(e), data=UNSAT).build(code=status.HTTP_400_BAD_REQUEST)
+    except SolveCancelled:
+        return Response("Solving was cancelled.", data=CANCELLED).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
     return Response("Cautious consequences (must haves)", str(csq))
 
 
@@ -831,42 +878,69 @@ async def get_brave():
     Returns brave consequences.
     These are things true in at least one model, meaning that these are suggestions.
     """
-    global solver
-    csq = str(solver.get_brave()).split(",")
+    session = current_session.get()
+    try:
+        csq = str(await in_solver_thread(lambda: session.solver.get_brave())).split(",")
+    except BudgetExceeded as e:
+        return Response(str(e), data=e.reason).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Unsatisfiable as e:
+        return Response(str(e), data=UNSAT).build(code=status.HTTP_400_BAD_REQUEST)
+    except SolveCancelled:
+        return Response("Solving was cancelled.", data=CANCELLED).build(code=status.HTTP_503_SERVICE_UNAVAILABLE)
     return Response("Brave consequences (possibilities)", str(csq))
 
 
 @app.put("/configurator/solver/load/{path}")
+@holding_solver
 def load_from_file(path):
-    global open_configuration_file
+    try:
+        return load_configuration(path)
+    except Exception:
+        return "Error while loading, solver will be reset."
+
+
+def load_configuration(path):
+    """
+    Loads a configuration file into the solver of the current session and opens it for saving.
+    If loading fails, the solver is reset and the error is raised, so that an import job fails.
+    """
+    session = current_session.get()
     try:
         res = import_solution(path)
-        open_configuration_file = path
-        return res
-    except:
+    except Exception:
         reset_solver()
-        return "Error while loading, solver will be reset."
+        raise
+    session.open_configuration_file = path
+    # the next save writes the whole file and removes its log of changes
+    session.changes.reset()
+    return res
 
 
 @app.get("/configurator/solver/model")
+@holding_solver
 def save_model_data():
-    global solver, solve_semaphore
-    if not solve_semaphore:
-        res = parse_model(solver.model)
+    session = current_session.get()
+    if not session.busy:
+        res = [f"{fact}." for fact in parse_model(session.solver.model_symbols)]
         return Response("Current model facts:", res).build()
     return Response("Solver busy.", None).build()
 
 
 @app.get("/configurator/solver/save/ooasp/{path}")
-def export_to_file(path):
-    export_as_file(path)
+@holding_solver
+def export_to_file(path, compact: Union[bool, None] = None):
+    """
+    Saves the assumptions to a file, in the compact format if compact is true.
+    By default, an existing file keeps its format.
+    """
+    export_as_file(path, compact)
     return path
 
 
 @app.get("/configurator/solver/save/image/{name}")
 async def get_diagram(name):
-    global solver
-    solver.save_png(name=name, extra_prg="_clinguin_browsing.")
+    session = current_session.get()
+    await in_solver_thread(lambda: session.solver.save_png(name=name, extra_prg="_clinguin_browsing."))
     return Response(f"File saved in ./out/{name}.png", data=None).build()
 
 # ---------- File management ----------
@@ -907,20 +981,17 @@ async def delete_domain(domain_name):
 
 @app.post("/request/save")
 async def force_save():
-    global solver, open_configuration_file, solve_semaphore
-    if open_configuration_file is None:
+    session = current_session.get()
+    if session.open_configuration_file is None:
         return Response("Cannot save. No file is opened.")
     else:
-        if solve_semaphore:
+        if session.busy:
             return Response("Solver is busy. State cannot be saved at this moment.")
-        assumptions_copy = copy.deepcopy(solver.assumptions)
-
-        def _threaded_save():
-            new_assumptions = parse_assumptions(assumptions_copy)
-            with open(open_configuration_file, "w+") as f:
-                for a in new_assumptions:
-                    f.write(a+"\n")
-            return
-        t1 = threading.Thread(target=_threaded_save)
-        t1.start()
-    return Response("Requested a save.", assumptions_copy)
+        assumptions_copy = await in_solver_thread(lambda: session.solver.assumptions.canonical)
+
+        def _facts():
+            return [parse_term(a[:-1]) for a in parse_assumptions(assumptions_copy)]
+
+        saves.submit(session.open_configuration_file, functools.partial(contextvars.copy_context().run, _facts))
+        session.changes.saved(session.open_configuration_file)
+    return Response("Requested a save.", list(assumptions_copy))
@@ -0,0 +1,116 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import itertools
+from collections import OrderedDict
+from typing import NamedTuple
+
+# Kinds of possibilities sent as options, the violations are sent separately
+OPTION_KINDS = ("objects", "associations", "attrs", "smart_suggestions")
+
+# Versions are shared by all sessions, so a version never identifies two different states,
+# even when a session is evicted and created again with the same id
+_versions = itertools.count(1)
+
+
+class Snapshot(NamedTuple):
+    graph: dict
+    possibilities: dict
+    nodes: dict
+    edges: dict
+    options: dict
+    violations: dict
+
+
+def _key(item: dict) -> tuple:
+    return tuple(sorted(item.items()))
+
+
+def snapshot(graph: dict, possibilities: dict) -> Snapshot:
+    """
+    Indexes the nodes and edges of a graph by id and the possibilities by their content.
+    """
+    return Snapshot(
+        graph,
+        possibilities,
+        {node["id"]: node for node in graph["nodes"]},
+        {edge["id"]: edge for edge in graph["edges"]},
+        {kind: {_key(item): item for item in possibilities.get(kind, ())} for kind in OPTION_KINDS},
+        {_key(vio): vio for vio in possibilities.get("violations", ())},
+    )
+
+
+def _diff(old: dict, new: dict) -> dict:
+    return {
+        "added": [new[k] for k in new.keys() - old.keys()],
+        "removed": list(old.keys() - new.keys()),
+        "changed": [new[k] for k in new.keys() & old.keys() if new[k] != old[k]],
+    }
+
+
+def _set_diff(old: dict, new: dict) -> dict:
+    return {
+        "added": [new[k] for k in new.keys() - old.keys()],
+        "removed": [old[k] for k in old.keys() - new.keys()],
+    }
+
+
+class StateHistory:
+    """
+    Versions of the state shown by the front-end: the graph of the configuration and the possibilities.
+    The version only increases when the content of the state changes, and the snapshots of the last versions
+    are kept to send the changes since one of them instead of the whole state.
+    """
+
+    def __init__(self, max_versions: int = 8) -> None:
+        """
+        Args:
+            max_versions (int): Number of versions kept to compute changes from
+        """
+        self.max_versions = max_versions
+        self.version = 0
+        self.versions = OrderedDict()
+        self._inputs = None
+
+    @property
+    def latest(self) -> Snapshot:
+        return self.versions.get(self.version)
+
+    def update(self, revision: int, possibilities: dict, build) -> int:
+        """
+        Returns the version of the state built from a revision of the graph and the possibilities.
+        The graph is only built with build() when one of them changed since the last call,
+        and a new version is only created when the built state differs from the latest one.
+        """
+        if self._inputs is not None and self._inputs[0] == revision and self._inputs[1] is possibilities:
+            return self.version
+        new = snapshot(build(), possibilities)
+        self._inputs = (revision, possibilities)
+        latest = self.latest
+        if latest is not None and (latest.nodes, latest.edges, latest.options, latest.violations) == (
+                new.nodes, new.edges, new.options, new.violations):
+            return self.version
+        self.version = next(_versions)
+        self.versions[self.version] = new
+        while len(self.versions) > self.max_versions:
+            self.versions.popitem(last=False)
+        return self.version
+
+    def delta(self, since: int) -> dict:
+        """
+        Returns the nodes, edges, options and violations added, removed or changed since a version.
+        Removed nodes and edges are given by id. Options and violations have no id, they are only added or removed.
+        Returns None if the version is not kept anymore.
+        """
+        old = self.versions.get(since)
+        if old is None:
+            return None
+        new = self.latest
+        return {
+            "version": self.version,
+            "since": since,
+            "nodes": _diff(old.nodes, new.nodes),
+            "edges": _diff(old.edges, new.edges),
+            "options": {kind: _set_diff(old.options[kind], new.options[kind]) for kind in OPTION_KINDS},
+            "violations": _set_diff(old.violations, new.violations),
+        }
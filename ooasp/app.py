@@ -9,7 +9,8 @@ import clingo
 from clingo import Control
 from clingo import Flag, ApplicationOptions
 
-from ooasp.smart_ooasp import SmartOOASPSolver, SMART_FUNCTIONS
+from ooasp.smart_ooasp import SmartOOASPSolver, SMART_FUNCTIONS, GROWTH_STRATEGIES, BudgetExceeded
+from ooasp.utils import red
 import os
 
 CLASSES = [
@@ -56,6 +57,13 @@ class OOASPRacksApp(clingo.Application):
         self._debug = Flag()
         self._initial_objects = []
         self._smart_functions = []
+        self._object_pool_size = 0
+        self._growth_strategy = "linear"
+        self._parallel_sizes = 0
+        self._guided_expansion = Flag()
+        self._time_limit = None
+        self._max_objects = None
+        self._max_atoms = None
 
     def parse_log_level(self, log_level: str) -> bool:
         """
@@ -84,6 +92,63 @@ class OOASPRacksApp(clingo.Application):
 
         return True
 
+    def parse_object_pool(self, object_pool_size: str) -> bool:
+        """
+        Parse size of the object pool
+        """
+        try:
+            self._object_pool_size = int(object_pool_size)
+        except ValueError:
+            return False
+        return self._object_pool_size >= 0
+
+    def parse_growth_strategy(self, growth_strategy: str) -> bool:
+        """
+        Parse growth strategy
+        """
+        self._growth_strategy = growth_strategy.strip()
+        return self._growth_strategy in GROWTH_STRATEGIES
+
+    def parse_parallel_sizes(self, parallel_sizes: str) -> bool:
+        """
+        Parse number of domain sizes solved in parallel
+        """
+        try:
+            self._parallel_sizes = int(parallel_sizes)
+        except ValueError:
+            return False
+        return self._parallel_sizes >= 0
+
+    def parse_time_limit(self, time_limit: str) -> bool:
+        """
+        Parse time limit of the search
+        """
+        try:
+            self._time_limit = float(time_limit)
+        except ValueError:
+            return False
+        return self._time_limit > 0
+
+    def parse_max_objects(self, max_objects: str) -> bool:
+        """
+        Parse maximum number of objects added by the search
+        """
+        try:
+            self._max_objects = int(max_objects)
+        except ValueError:
+            return False
+        return self._max_objects >= 0
+
+    def parse_max_atoms(self, max_atoms: str) -> bool:
+        """
+        Parse maximum number of grounded atoms
+        """
+        try:
+            self._max_atoms = int(max_atoms)
+        except ValueError:
+            return False
+        return self._max_atoms >= 0
+
     def meta_parse_object(self, class_name: str):
         """
         Wrapper function to parse the number of objects of a class
@@ -116,6 +181,59 @@ class OOASPRacksApp(clingo.Application):
             self.parse_smart_functions,
             argument="<smart_functions>",
         )
+        options.add(
+            group,
+            "object-pool",
+            "Number of placeholder objects grounded ahead of time in a batch for the UNSAT steps",
+            self.parse_object_pool,
+            argument="<number>",
+        )
+        options.add(
+            group,
+            "growth-strategy",
+            textwrap.dedent(
+                f"""\
+                How the domain grows when solving is UNSAT.
+                One of: {",".join(GROWTH_STRATEGIES)}
+                """
+            ),
+            self.parse_growth_strategy,
+            argument="<strategy>",
+        )
+        options.add(
+            group,
+            "parallel-sizes",
+            "Number of domain sizes solved at the same time in worker processes when solving is UNSAT",
+            self.parse_parallel_sizes,
+            argument="<number>",
+        )
+        options.add_flag(
+            group,
+            "guided-expansion",
+            "Choose the class of the objects added when solving is UNSAT from the UNSAT core",
+            self._guided_expansion,
+        )
+        options.add(
+            group,
+            "search-time-limit",
+            "Seconds the search may take before it stops",
+            self.parse_time_limit,
+            argument="<seconds>",
+        )
+        options.add(
+            group,
+            "max-objects",
+            "Maximum number of objects added by the search",
+            self.parse_max_objects,
+            argument="<number>",
+        )
+        options.add(
+            group,
+            "max-atoms",
+            "Maximum number of grounded atoms before the search stops adding objects",
+            self.parse_max_atoms,
+            argument="<number>",
+        )
         options.add_flag(
             group, "view", "Visualize the first solution using clingraph", self._view
         )
@@ -143,11 +261,22 @@ class OOASPRacksApp(clingo.Application):
             self._view,
             ctl,
             associations_with_priority=ASSOCIATION_SPECIALIZATIONS,
+            object_pool_size=self._object_pool_size,
+            growth_strategy=self._growth_strategy,
+            parallel_sizes=self._parallel_sizes,
+            guided_expansion=self._guided_expansion.flag,
+            time_limit=self._time_limit,
+            max_objects=self._max_objects,
+            max_atoms=self._max_atoms,
         )
-        ctl.load(os.path.join("examples", "racks", "kb.lp"))
+        smartOOASPSolver.load(os.path.join("examples", "racks", "kb.lp"))
         smartOOASPSolver.load_base()
         smartOOASPSolver.create_initial_objects()
-        smartOOASPSolver.smart_complete()
+        try:
+            smartOOASPSolver.smart_complete()
+        except BudgetExceeded as e:
+            print(red(f"{e.reason.upper()}: {e}"))
+            return
 
         if self._view:
             smartOOASPSolver.save_png(extra_prg="_clinguin_browsing.")
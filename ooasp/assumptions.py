@@ -0,0 +1,229 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+from collections import defaultdict
+from collections.abc import MutableSet
+from typing import Iterator, Optional
+
+from clingo import Control, parse_term
+from clingo.symbol import Symbol, SymbolType
+
+# Positions of the arguments holding object ids for each predicate used as assumption
+OBJECT_ARGUMENTS = {
+    "ooasp_isa": (1,),
+    "ooasp_attr_value": (1,),
+    "ooasp_associated": (1, 2),
+}
+
+
+class AssumptionStore(MutableSet):
+    """
+    Set of the assumptions of the solver stored as clingo symbols.
+    The assumptions are indexed by predicate, by object id and by object and attribute,
+    and the list of assumptions passed to the solver is rebuilt only when the store changes.
+    Assumptions can be given either as symbols or as strings, which are parsed.
+    Each listener is called with a flag telling if the assumption was added and the assumption
+    for every change in the store.
+    """
+
+    def __init__(self, assumptions=()):
+        self.listeners = []
+        self._symbols = set()
+        self._by_predicate = defaultdict(set)
+        self._by_object = defaultdict(set)
+        self._attribute_values = {}
+        self._assumption_list = None
+        self._canonical = None
+        self.update(assumptions)
+
+    @staticmethod
+    def _symbol(assumption: str | Symbol) -> Symbol:
+        return parse_term(assumption) if isinstance(assumption, str) else assumption
+
+    @staticmethod
+    def _object_ids(name: str, args: list[Symbol]) -> list[int]:
+        ids = []
+        for i in OBJECT_ARGUMENTS.get(name, ()):
+            arg = args[i]
+            if arg.type == SymbolType.Number:
+                ids.append(arg.number)
+        return ids
+
+    def _notify(self, added: bool, symbol: Symbol) -> None:
+        for listener in self.listeners:
+            listener(added, symbol)
+
+    def _changed(self) -> None:
+        self._assumption_list = None
+        self._canonical = None
+
+    def __contains__(self, assumption: str | Symbol) -> bool:
+        return self._symbol(assumption) in self._symbols
+
+    def __iter__(self) -> Iterator[Symbol]:
+        return iter(self._symbols)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(str(s) for s in self._symbols) + "}"
+
+    def add(self, assumption: str | Symbol) -> None:
+        """
+        Adds an assumption. Adding a value for an attribute does not remove other values of the attribute,
+        use set_attribute_value for that.
+
+        Args:
+            assumption (str | clingo.Symbol): The assumption to add
+        """
+        symbol = self._symbol(assumption)
+        if symbol in self._symbols:
+            return
+        self._insert(symbol)
+        self._changed()
+        self._notify(True, symbol)
+
+    def update(self, assumptions) -> None:
+        """
+        Adds several assumptions, for instance all the assumptions of a configuration file.
+
+        Args:
+            assumptions (Iterable[str | clingo.Symbol]): The assumptions to add
+        """
+        added = []
+        for assumption in assumptions:
+            symbol = self._symbol(assumption)
+            if symbol not in self._symbols:
+                self._insert(symbol)
+                added.append(symbol)
+        if not added:
+            return
+        self._changed()
+        for symbol in added:
+            self._notify(True, symbol)
+
+    def _insert(self, symbol: Symbol) -> None:
+        name = symbol.name
+        args = symbol.arguments
+        self._symbols.add(symbol)
+        self._by_predicate[name].add(symbol)
+        for o_id in self._object_ids(name, args):
+            self._by_object[o_id].add(symbol)
+        if name == "ooasp_attr_value":
+            self._attribute_values[(args[1], args[0])] = symbol
+
+    def discard(self, assumption: str | Symbol) -> None:
+        """
+        Removes an assumption if it is in the store.
+
+        Args:
+            assumption (str | clingo.Symbol): The assumption to remove
+        """
+        symbol = self._symbol(assumption)
+        if symbol not in self._symbols:
+            return
+        name = symbol.name
+        args = symbol.arguments
+        self._symbols.remove(symbol)
+        self._by_predicate[name].discard(symbol)
+        for o_id in self._object_ids(name, args):
+            self._by_object[o_id].discard(symbol)
+        if name == "ooasp_attr_value":
+            key = (args[1], args[0])
+            if self._attribute_values.get(key) == symbol:
+                del self._attribute_values[key]
+        self._changed()
+        self._notify(False, symbol)
+
+    def clear(self) -> None:
+        """
+        Removes all assumptions.
+        """
+        for symbol in self._symbols:
+            self._notify(False, symbol)
+        self._symbols.clear()
+        self._by_predicate.clear()
+        self._by_object.clear()
+        self._attribute_values.clear()
+        self._changed()
+
+    def by_predicate(self, name: str) -> set[Symbol]:
+        """
+        Returns the assumptions with the given predicate name.
+        """
+        return set(self._by_predicate.get(name, ()))
+
+    def by_object(self, o_id: int) -> set[Symbol]:
+        """
+        Returns the assumptions mentioning the object with the given id.
+        """
+        return set(self._by_object.get(o_id, ()))
+
+    def attribute_value(self, o_id: int | Symbol, attr: str | Symbol) -> Optional[Symbol]:
+        """
+        Returns the assumption assigning a value to the attribute of an object, None if there is none.
+        """
+        return self._attribute_values.get((self._symbol(str(o_id)), self._symbol(str(attr))))
+
+    def set_attribute_value(self, assumption: str | Symbol) -> None:
+        """
+        Adds an assumption ooasp_attr_value(ATTR,ID,VALUE) replacing any other value of the attribute of the object.
+
+        Args:
+            assumption (str | clingo.Symbol): The attribute value to add
+        """
+        symbol = self._symbol(assumption)
+        old = self._attribute_values.get((symbol.arguments[1], symbol.arguments[0]))
+        if old is not None:
+            self.discard(old)
+        self.add(symbol)
+
+    @property
+    def assumption_list(self) -> list[tuple[Symbol, bool]]:
+        """
+        List of assumptions in the format expected by clingo, rebuilt only when the store changes.
+        """
+        if self._assumption_list is None:
+            self._assumption_list = [(s, True) for s in self._symbols]
+        return self._assumption_list
+
+    @property
+    def canonical(self) -> tuple[str]:
+        """
+        Sorted string representation of the assumptions, rebuilt only when the store changes.
+        """
+        if self._canonical is None:
+            self._canonical = tuple(sorted(str(s) for s in self._symbols))
+        return self._canonical
+
+
+def read_facts(path: str) -> list[Symbol]:
+    """
+    Reads the facts of a configuration file without solving it.
+    Files written by saving a configuration have one fact per line, which is parsed directly.
+    Any other file, for instance with rules or several statements in a line, is grounded
+    and the facts are read from the grounding.
+
+    Args:
+        path (str): The path of the file
+
+    Returns:
+        list[clingo.Symbol]: The facts of the file
+    """
+    facts = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("%"):
+                continue
+            try:
+                if not line.endswith("."):
+                    raise RuntimeError()
+                facts.append(parse_term(line[:-1]))
+            except RuntimeError:
+                ctl = Control(["--warn=none"])
+                ctl.load(path)
+                ctl.ground([("base", [])])
+                return [atom.symbol for atom in ctl.symbolic_atoms if atom.is_fact]
+    return facts
@@ -0,0 +1,113 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Iterable
+
+from clingo import Control
+from clingo.symbol import Symbol
+
+from ooasp.consequence_cache import domain_key
+
+KB_ENCODING = os.path.join("ooasp", "encodings", "ooasp_aux_kb.lp")
+
+
+class KBCatalog:
+    """
+    Classes, associations, attributes and specializations of associations of a knowledge base, indexed by
+    class, association and attribute. Built from the facts obtained by grounding the knowledge base with
+    the auxiliary predicates of the KB, so subclasses are transitive and leaf classes are derived.
+    """
+
+    def __init__(self, facts: Iterable[Symbol]) -> None:
+        self.classes = []
+        self.leafclasses = []
+        # superclasses and subclasses of each class, direct or not
+        self.superclasses = defaultdict(list)
+        self.subclasses = defaultdict(list)
+        # associations by name in the format of the REST API
+        self.associations = {}
+        # names of the associations from or to each class
+        self.class_associations = defaultdict(list)
+        # type of each attribute by class and attribute name
+        self.attributes = defaultdict(dict)
+        # classes having each attribute
+        self.attribute_classes = defaultdict(list)
+        # specializations of each association
+        self.specializations = defaultdict(list)
+        for fact in facts:
+            args = [str(arg) for arg in fact.arguments]
+            name = fact.name
+            if name == "ooasp_class" and len(args) == 1:
+                self.classes.append(args[0])
+            elif name == "ooasp_leafclass" and len(args) == 1:
+                self.leafclasses.append(args[0])
+            elif name == "ooasp_subclass" and len(args) == 2:
+                self.superclasses[args[0]].append(args[1])
+                self.subclasses[args[1]].append(args[0])
+            elif name == "ooasp_assoc" and len(args) == 7:
+                assoc, source, source_min, source_max, target, target_min, target_max = args
+                self.associations[assoc] = {
+                    "from": source,
+                    "fromMin": source_min,
+                    "fromMax": source_max,
+                    "to": target,
+                    "toMin": target_min,
+                    "toMax": target_max,
+                }
+                self.class_associations[source].append(assoc)
+                if target != source:
+                    self.class_associations[target].append(assoc)
+            elif name == "ooasp_attr" and len(args) == 3:
+                self.attributes[args[0]][args[1]] = args[2]
+                self.attribute_classes[args[1]].append(args[0])
+            elif name == "ooasp_assoc_specialization" and len(args) == 2:
+                self.specializations[args[1]].append(args[0])
+
+    @property
+    def attribute_list(self) -> list[dict]:
+        """
+        Attributes of all classes in the format of the REST API.
+        """
+        return [{"class": cls, "attribute": attr, "type": attr_type}
+                for cls, attrs in self.attributes.items() for attr, attr_type in attrs.items()]
+
+    def class_attributes(self, cls: str) -> dict:
+        """
+        Returns the type of each attribute of a class, including the attributes of its superclasses.
+        """
+        attributes = {}
+        for c in reversed([cls] + self.superclasses.get(cls, [])):
+            attributes.update(self.attributes.get(c, {}))
+        return attributes
+
+
+_catalogs = OrderedDict()
+_catalogs_lock = threading.Lock()
+MAX_CATALOGS = 32
+
+
+def kb_catalog(path: str) -> KBCatalog:
+    """
+    Returns the catalog of the knowledge base in a file, grounding only the knowledge base without solving.
+    Catalogs are kept by the hash of the .lp files in the directory of the knowledge base, which may be included
+    by it, and of the encoding of the auxiliary predicates.
+    """
+    key = domain_key([path, KB_ENCODING], os.path.dirname(path) or ".")
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is not None:
+            _catalogs.move_to_end(key)
+            return catalog
+    ctl = Control(["--warn=none"])
+    ctl.load(path)
+    ctl.load(KB_ENCODING)
+    ctl.ground([("base", [])])
+    catalog = KBCatalog(atom.symbol for atom in ctl.symbolic_atoms if atom.is_fact)
+    with _catalogs_lock:
+        _catalogs[key] = catalog
+        while len(_catalogs) > MAX_CATALOGS:
+            _catalogs.popitem(last=False)
+    return catalog
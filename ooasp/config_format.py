@@ -0,0 +1,273 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+"""
+Compact format for configurations, as an alternative to .lp files with one fact per line.
+
+The format is JSON lines. The first line is a header with the name and version of the format.
+Then each section starts with a line {"section": NAME} and holds one record per line,
+the arguments of a fact as a JSON array:
+
+    {"format": "ooasp-config", "version": 1}
+    {"section": "objects"}
+    ["frame", 1]
+    {"section": "associations"}
+    ["rack_frames", 2, 1]
+    {"section": "attributes"}
+    ["frame_position", 1, 3]
+
+Numbers are written as JSON numbers and constants as JSON strings, any other term as {"term": TEXT}.
+Facts of other predicates are kept in the section facts as [TEXT]. A section can appear several times.
+Sections can be skipped when reading without decoding their records, and the format can be processed
+without clingo, for instance to diff or merge configurations.
+
+A configuration file in either format can have a log of changes next to it, in the file with the suffix .log.
+Its first line holds the hash of the file the changes apply to, followed by one change per line: +FACT for
+a fact added and -FACT for a fact removed. The log is replayed by load_facts, and ignored if the file
+has changed since the log was started.
+
+Run as python -m ooasp.config_format (to-jsonl | to-lp) SOURCE TARGET to convert files.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from typing import Iterable, Iterator, Optional, TextIO
+
+from clingo import parse_term
+from clingo.symbol import Symbol, SymbolType
+
+from ooasp.assumptions import read_facts
+
+FORMAT = "ooasp-config"
+VERSION = 1
+
+# Predicate and arity of the facts of each section
+SECTIONS = {
+    "objects": ("ooasp_isa", 2),
+    "associations": ("ooasp_associated", 3),
+    "attributes": ("ooasp_attr_value", 3),
+}
+OTHER = "facts"
+_SECTION_OF = {signature: section for section, signature in SECTIONS.items()}
+
+LOG_SUFFIX = ".log"
+
+
+def _encode(symbol: Symbol):
+    if symbol.type == SymbolType.Number:
+        return symbol.number
+    if symbol.type == SymbolType.Function and not symbol.arguments and symbol.positive:
+        return symbol.name
+    return {"term": str(symbol)}
+
+
+def _encode_text(text: str):
+    if text.lstrip("-").isdigit():
+        return int(text)
+    if text[:1].islower() and text.replace("_", "").isalnum():
+        return text
+    return {"term": text}
+
+
+def _record(fact: Symbol) -> tuple[str, list]:
+    text = str(fact)
+    name, paren, rest = text.partition("(")
+    if not paren or '"' in rest or "(" in rest:
+        # strings and nested terms are walked, since their representation can contain parentheses and commas
+        args = fact.arguments
+        section = _SECTION_OF.get((fact.name, len(args))) if fact.positive else None
+        if section is None:
+            return OTHER, [text]
+        return section, [_encode(arg) for arg in args]
+    # the arguments are constants or numbers, reading them from the representation of the fact
+    # avoids calls to clingo for each argument
+    args = rest[:-1].split(",")
+    section = _SECTION_OF.get((name, len(args)))
+    if section is None:
+        return OTHER, [text]
+    return section, [_encode_text(arg) for arg in args]
+
+
+def _text(value) -> str:
+    return value["term"] if isinstance(value, dict) else str(value)
+
+
+def _fact(section: str, record: list) -> Symbol:
+    if section == OTHER:
+        return parse_term(record[0])
+    return parse_term(f"{SECTIONS[section][0]}({','.join(_text(v) for v in record)})")
+
+
+def read_records(f: TextIO, sections: Optional[Iterable[str]] = None) -> Iterator[tuple[str, list]]:
+    """
+    Reads the records of a file in the compact format lazily.
+
+    Args:
+        f (TextIO): The open file
+        sections (Iterable[str], optional): The sections to read, the records of other sections are skipped
+                                            without decoding them. By default, all sections are read.
+
+    Yields:
+        tuple[str, list]: The section and the record
+
+    Raises:
+        ValueError: If the file is not in the compact format or has a newer version
+    """
+    header = _header(f.readline())
+    if header is None:
+        raise ValueError("Not a configuration in the compact format")
+    if header["version"] > VERSION:
+        raise ValueError(f"Unsupported version {header['version']} of the compact format")
+    sections = None if sections is None else set(sections)
+    section, keep = None, False
+    for line in f:
+        if line.startswith("{"):
+            section = json.loads(line)["section"]
+            keep = sections is None or section in sections
+        elif keep and line.strip():
+            yield section, json.loads(line)
+
+
+def read_config(path: str, sections: Optional[Iterable[str]] = None) -> Iterator[Symbol]:
+    """
+    Reads the facts of a file in the compact format lazily, see read_records.
+    """
+    with open(path) as f:
+        for section, record in read_records(f, sections):
+            yield _fact(section, record)
+
+
+def write_config(path: str, facts: Iterable[Symbol]) -> None:
+    """
+    Writes facts to a file in the compact format, grouped by section and sorted, so that files of similar
+    configurations can be compared line by line.
+    """
+    by_section = {section: [] for section in [*SECTIONS, OTHER]}
+    for fact in facts:
+        section, record = _record(fact)
+        by_section[section].append(json.dumps(record, separators=(",", ":")))
+    with open(path, "w") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION}) + "\n")
+        for section, lines in by_section.items():
+            if lines:
+                f.write(json.dumps({"section": section}) + "\n")
+                f.write("\n".join(sorted(lines)) + "\n")
+
+
+def _header(line: str) -> Optional[dict]:
+    if not line.startswith("{"):
+        return None
+    try:
+        header = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return header if isinstance(header, dict) and header.get("format") == FORMAT else None
+
+
+def is_config(path: str) -> bool:
+    """
+    Returns True if the file is in the compact format.
+    """
+    with open(path) as f:
+        return _header(f.readline()) is not None
+
+
+def load_facts(path: str) -> list[Symbol]:
+    """
+    Reads the facts of a configuration file either in the compact format or as .lp file,
+    and replays its log of changes if there is one.
+    """
+    facts = list(read_config(path)) if is_config(path) else read_facts(path)
+    if os.path.exists(path + LOG_SUFFIX):
+        facts = replay(facts, read_changes(path))
+    return facts
+
+
+def file_hash(path: str) -> str:
+    """
+    Returns the hash of the content of a file, which identifies the file a log of changes applies to.
+    """
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def log_header(path: str, digest: Optional[str] = None) -> str:
+    """
+    Returns the first line of the log of changes of a file, given the hash of the file if it is known.
+    """
+    return f"snapshot {digest or file_hash(path)}\n"
+
+
+def format_changes(changes: Iterable[tuple[bool, Symbol]]) -> str:
+    """
+    Returns the lines of the log for changes given as (added, fact).
+    """
+    return "".join(f"{'+' if added else '-'}{fact}\n" for added, fact in changes)
+
+
+def read_changes(path: str) -> Iterator[tuple[bool, Symbol]]:
+    """
+    Reads the log of changes of a configuration file lazily as (added, fact).
+    Nothing is read if the log was started for another content of the file, and a last line
+    interrupted while being written is ignored.
+    """
+    with open(path + LOG_SUFFIX) as f:
+        if f.readline() != log_header(path):
+            return
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            yield line[0] == "+", parse_term(line[1:-1])
+
+
+def replay(facts: Iterable[Symbol], changes: Iterable[tuple[bool, Symbol]]) -> list[Symbol]:
+    """
+    Applies changes given as (added, fact) to facts, keeping their order.
+    """
+    state = dict.fromkeys(facts)
+    for added, fact in changes:
+        if added:
+            state[fact] = None
+        else:
+            state.pop(fact, None)
+    return list(state)
+
+
+def save_facts(path: str, facts: Iterable[Symbol], compact: Optional[bool] = None) -> None:
+    """
+    Writes the facts of a configuration file either in the compact format or as .lp file.
+    By default, the format of an existing file is kept and new files are written as .lp files.
+    """
+    if compact is None:
+        compact = os.path.exists(path) and is_config(path)
+    if compact:
+        write_config(path, facts)
+        return
+    with open(path, "w") as f:
+        for fact in facts:
+            f.write(f"{fact}.\n")
+
+
+def lp_to_config(source: str, target: str) -> None:
+    """
+    Converts an .lp file with facts into the compact format.
+    """
+    write_config(target, read_facts(source))
+
+
+def config_to_lp(source: str, target: str) -> None:
+    """
+    Converts a file in the compact format into an .lp file with one fact per line.
+    """
+    save_facts(target, read_config(source), compact=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts configurations between .lp files and the compact format")
+    parser.add_argument("direction", choices=["to-jsonl", "to-lp"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args()
+    (lp_to_config if args.direction == "to-jsonl" else config_to_lp)(args.source, args.target)
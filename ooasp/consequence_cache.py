@@ -0,0 +1,237 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from clingo import parse_term
+from clingo.symbol import Symbol
+
+
+def state_key(assumptions: Iterable[str], grounded_objects: list, disabled: list) -> str:
+    """
+    Computes a canonical hash of a solver state.
+
+    Args:
+        assumptions (Iterable[str]): The assumptions of the solver, sorted
+        grounded_objects (list[tuple[int, str]]): The ids and classes of the grounded objects
+        disabled (list[int]): The ids of the grounded objects that are disabled
+
+    Returns:
+        str: The hexadecimal digest identifying the state
+    """
+    h = hashlib.sha256()
+    for a in assumptions:
+        h.update(a.encode())
+        h.update(b"\n")
+    h.update(repr(list(grounded_objects)).encode())
+    h.update(repr(sorted(disabled)).encode())
+    return h.hexdigest()
+
+
+def domain_key(files: list[str], encodings: Optional[str] = None, programs: Iterable[tuple] = ()) -> str:
+    """
+    Computes a hash of the contents of the loaded files and of the added programs.
+
+    Args:
+        files (list[str]): The paths of the files loaded in the solver
+        encodings (str, optional): Directory whose .lp files are included by the loaded files.
+        programs (Iterable[tuple[str, list[str], str]]): The programs added to the solver
+
+    Returns:
+        str: The hexadecimal digest identifying the domain
+    """
+    paths = list(files)
+    if encodings is not None:
+        paths += sorted(os.path.join(encodings, f) for f in os.listdir(encodings) if f.endswith(".lp"))
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    for program in programs:
+        h.update(repr(program).encode())
+    return h.hexdigest()
+
+
+class ConsequenceCache:
+    """
+    Bounded cache of consequences keyed by the state of the solver and the type of consequences.
+    The least recently used entries are evicted once the number of entries or the total number of stored
+    symbols exceeds the limits.
+    If a directory is given, entries are also written to disk under the hash of the domain,
+    so that they can be reused by solvers created later on for the same domain.
+    The files on disk are evicted in least recently used order, by modification time, once their total size
+    exceeds the limit. Reading a file from disk updates its modification time.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        max_symbols: int = 1000000,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory. If 0, nothing is kept in memory.
+            max_symbols (int): Maximum number of symbols kept in memory, summed over all entries.
+            directory (str, optional): Directory of the on-disk tier. If None, there is no on-disk tier.
+            max_disk_bytes (int): Maximum size in bytes of the files in the directory, summed over all domains.
+        """
+        self.max_entries = max_entries
+        self.max_symbols = max_symbols
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.domain = None
+        self.entries = OrderedDict()
+        self.symbols = 0
+        # size of the files in the directory, None until it is first needed
+        self.disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the statistics of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "entries": len(self.entries),
+            "symbols": self.symbols,
+        }
+
+    def _path(self, key: str, conseq_type: str) -> Optional[str]:
+        if self.directory is None or self.domain is None:
+            return None
+        return os.path.join(self.directory, self.domain, f"{key}.{conseq_type}.lp")
+
+    def get(self, key: str, conseq_type: str) -> Optional[list[Symbol]]:
+        """
+        Looks up the consequences of a state, first in memory and then on disk.
+
+        Args:
+            key (str): The key of the state
+            conseq_type (str): The type of consequences, either "cautious" or "brave"
+
+        Returns:
+            list[clingo.Symbol]: The stored consequences, None if they are not stored.
+        """
+        entry = self.entries.get((key, conseq_type))
+        if entry is not None:
+            self.entries.move_to_end((key, conseq_type))
+            self.hits += 1
+            return entry
+        path = self._path(key, conseq_type)
+        if path is not None and os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = [parse_term(line) for line in f.read().splitlines() if line]
+                os.utime(path)
+            except FileNotFoundError:
+                # evicted by another cache using the same directory
+                self.misses += 1
+                return None
+            self._add(key, conseq_type, entry)
+            self.disk_hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: str, conseq_type: str, consequences: list[Symbol]) -> None:
+        """
+        Stores the consequences of a state in memory and, if there is an on-disk tier, on disk.
+
+        Args:
+            key (str): The key of the state
+            conseq_type (str): The type of consequences, either "cautious" or "brave"
+            consequences (list[clingo.Symbol]): The consequences to store
+        """
+        self._add(key, conseq_type, consequences)
+        path = self._path(key, conseq_type)
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(str(s) for s in consequences))
+            os.replace(tmp_path, path)
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self.disk_bytes += os.path.getsize(path)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _disk_files(self) -> list[tuple[float, int, str]]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    # being written
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((info.st_mtime, info.st_size, path))
+        return files
+
+    def _prune_disk(self) -> None:
+        """
+        Removes the least recently used files of the directory until their size is within the limit.
+        The directory is scanned again, since other caches may use it as well.
+        """
+        files = sorted(self._disk_files())
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= size
+            self.disk_evictions += 1
+
+    def _add(self, key: str, conseq_type: str, consequences: list[Symbol]) -> None:
+        if self.max_entries <= 0 or len(consequences) > self.max_symbols:
+            return
+        old = self.entries.pop((key, conseq_type), None)
+        if old is not None:
+            self.symbols -= len(old)
+        self.entries[(key, conseq_type)] = consequences
+        self.symbols += len(consequences)
+        while len(self.entries) > self.max_entries or self.symbols > self.max_symbols:
+            _, evicted = self.entries.popitem(last=False)
+            self.symbols -= len(evicted)
+            self.evictions += 1
+
+    def clear(self, disk: bool = False) -> None:
+        """
+        Removes all entries kept in memory.
+
+        Args:
+            disk (bool): If True, the files of all domains in the directory are removed as well.
+                         Otherwise they are kept, since they stay valid for their domain.
+        """
+        self.entries.clear()
+        self.symbols = 0
+        if disk and self.directory is not None:
+            for _, _, path in self._disk_files():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.disk_bytes = 0
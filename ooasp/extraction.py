@@ -0,0 +1,197 @@
+# Copyright (c) 2024 Siemens AG Oesterreich
+# SPDX-License-Identifier: MIT
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from clingo.symbol import Symbol, SymbolType
+
+from ooasp.smart_ooasp import SMART_FUNCTIONS
+
+
+class Object(NamedTuple):
+    cls: str
+    id: str
+    symbol: Symbol
+
+
+class Association(NamedTuple):
+    name: str
+    source: str
+    target: str
+    symbol: Symbol
+
+
+class AttributeValue(NamedTuple):
+    name: str
+    object_id: str
+    value: str
+    symbol: Symbol
+
+
+class Violation(NamedTuple):
+    name: str
+    object_id: str
+    message: str
+    args: tuple[str, ...]
+    symbol: Symbol
+
+
+class Suggestion(NamedTuple):
+    function: str
+    args: tuple[str, ...]
+    symbol: Symbol
+
+
+class KBAssociation(NamedTuple):
+    name: str
+    source: str
+    source_min: str
+    source_max: str
+    target: str
+    target_min: str
+    target_max: str
+    symbol: Symbol
+
+
+class KBAttribute(NamedTuple):
+    cls: str
+    name: str
+    type: str
+    symbol: Symbol
+
+
+class Specialization(NamedTuple):
+    sub: str
+    sup: str
+    symbol: Symbol
+
+
+def text(symbol: Symbol) -> str:
+    """
+    Returns the content of a string symbol, and the string representation of any other symbol.
+    """
+    return symbol.string if symbol.type == SymbolType.String else str(symbol)
+
+
+def format_message(template: str, args: tuple[str, ...]) -> str:
+    """
+    Replaces each {} of the template of a constraint violation by the corresponding argument.
+    """
+    parts = template.split("{}")
+    message = parts[0]
+    for i, part in enumerate(parts[1:]):
+        message += (args[i] if i < len(args) else "{}") + part
+    return message
+
+
+def _violation(symbol: Symbol, args: list[Symbol]) -> Violation:
+    values = args[3]
+    if values.type == SymbolType.Function and values.name == "":
+        values = values.arguments
+    else:
+        values = [values]
+    values = tuple(text(v) for v in values)
+    return Violation(str(args[0]), str(args[1]), format_message(text(args[2]), values), values, symbol)
+
+
+# Kind of record and function building it for each predicate and arity
+RECORDS = {
+    ("ooasp_isa", 2): ("objects", lambda s, args: Object(str(args[0]), str(args[1]), s)),
+    ("ooasp_isa_leaf", 2): ("leaf_objects", lambda s, args: Object(str(args[0]), str(args[1]), s)),
+    ("ooasp_associated", 3): ("associations", lambda s, args: Association(*map(str, args), s)),
+    ("ooasp_attr_value", 3): ("attribute_values", lambda s, args: AttributeValue(*map(str, args), s)),
+    ("ooasp_cv", 4): ("violations", _violation),
+    ("ooasp_leafclass", 1): ("leafclasses", lambda s, args: str(args[0])),
+    ("ooasp_assoc", 7): ("kb_associations", lambda s, args: KBAssociation(*map(str, args), s)),
+    ("ooasp_attr", 3): ("kb_attributes", lambda s, args: KBAttribute(*map(str, args), s)),
+    ("ooasp_assoc_specialization", 2): ("specializations", lambda s, args: Specialization(*map(str, args), s)),
+}
+for _name, _f in SMART_FUNCTIONS.items():
+    RECORDS[(_name, _f["arity"])] = (
+        "suggestions", lambda s, args, name=_name: Suggestion(name, tuple(map(str, args)), s)
+    )
+
+# Records by symbol, shared by all extractions since consecutive consequences mostly contain the same symbols.
+# The least recently used ones are dropped once there are more than RECORDS_SIZE.
+_records = OrderedDict()
+_records_lock = threading.Lock()
+RECORDS_SIZE = 100000
+
+
+def _record(symbol: Symbol):
+    name, paren, rest = str(symbol).partition("(")
+    if not paren:
+        return None
+    if '"' in rest or "(" in rest:
+        # strings and nested terms are walked, since their representation can contain parentheses and commas
+        args = symbol.arguments
+        name = symbol.name
+    else:
+        # the arguments are constants or numbers, reading them from the representation of the symbol
+        # avoids one call to clingo per argument
+        args = rest[:-1].split(",")
+    entry = RECORDS.get((name, len(args)))
+    if entry is None:
+        return None
+    return entry[0], entry[1](symbol, args)
+
+
+class Extraction:
+    """
+    Atoms of a list of symbols, either consequences or a model, sorted by kind in a single pass over the symbols:
+    objects, associations, attribute values, constraint violations, suggestions of the smart generation functions
+    and the knowledge base (leaf classes, associations, attributes and specializations of associations).
+    Each symbol is walked once and its record is reused by later extractions.
+    """
+
+    def __init__(self, symbols: list[Symbol]) -> None:
+        self.objects = []
+        self.leaf_objects = []
+        self.associations = []
+        self.attribute_values = []
+        self.violations = []
+        self.suggestions = []
+        self.leafclasses = []
+        self.kb_associations = []
+        self.kb_attributes = []
+        self.specializations = []
+        kinds = {kind: getattr(self, kind) for kind, _ in RECORDS.values()}
+        with _records_lock:
+            for symbol in symbols:
+                record = _records.get(symbol, False)
+                if record is False:
+                    record = _records[symbol] = _record(symbol)
+                else:
+                    _records.move_to_end(symbol)
+                if record is not None:
+                    kinds[record[0]].append(record[1])
+            while len(_records) > RECORDS_SIZE:
+                _records.popitem(last=False)
+
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+MEMO_SIZE = 8
+
+
+def extract(symbols: list[Symbol]) -> Extraction:
+    """
+    Returns the extraction of a list of symbols.
+    The extractions of the last lists given are kept, so the same list of consequences is only walked once.
+    Lists are identified by identity and must not be modified after being extracted.
+    """
+    key = id(symbols)
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is not None and entry[0] is symbols:
+            _memo.move_to_end(key)
+            return entry[1]
+    extraction = Extraction(symbols)
+    with _memo_lock:
+        # the list is kept with its extraction so that its id is not reused while it is memoized
+        _memo[key] = (symbols, extraction)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return extraction
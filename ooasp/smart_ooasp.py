@@ -1,11 +1,18 @@
 # Copyright (c) 2024 Siemens AG Oesterreich
 # SPDX-License-Identifier: MIT
 
+import functools
+import multiprocessing
 import os
+import threading
 import time
 from collections import defaultdict
+from queue import Empty
+from contextlib import contextmanager
 
 from clingo import Control, Function, Model, Number, parse_term
+from clingo.configuration import Configuration
+from clingo.solving import SolveHandle
 from clingo.statistics import StatisticsMap
 from clingo.symbol import Symbol
 from clingraph.clingo_utils import ClingraphContext
@@ -13,6 +20,8 @@ from clingraph.graphviz import compute_graphs, render
 from clingraph.orm import Factbase
 
 import ooasp.settings as settings
+from ooasp.assumptions import AssumptionStore
+from ooasp.consequence_cache import ConsequenceCache, domain_key, state_key
 from ooasp.utils import green, red, subtitle, title
 
 SMART_FUNCTIONS = {
@@ -22,6 +31,107 @@ SMART_FUNCTIONS = {
     "association_possible": {"type": "brave", "arity": 4},
 }
 
+GROWTH_STRATEGIES = ["linear", "doubling", "bisection"]
+
+
+class SolveCancelled(Exception):
+    """
+    Raised by a solving method of the solver when it was cancelled with SmartOOASPSolver.cancel.
+    """
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a solving method of the solver when it exceeds one of the budgets of the solver.
+    The reason is "timeout" for the time limit, "objects" for the maximum number of added objects
+    and "atoms" for the maximum number of grounded atoms.
+    """
+
+    def __init__(self, reason: str, message: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+class Unsatisfiable(Exception):
+    """
+    Raised when the consequences of a configuration are requested but the configuration has no model.
+    """
+
+
+def journaled(method):
+    """
+    Decorator recording all changes made by a method of the solver as a single step of the journal.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.journal_step():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def budgeted(method):
+    """
+    Decorator applying the budgets of the solver to a call of a method of the solver.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.budget():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _configuration(config: Configuration) -> dict:
+    """
+    Obtains the options of a clingo configuration that have a value, by their path in the configuration.
+    """
+    values = {}
+    for key in config.keys:
+        value = getattr(config, key)
+        if isinstance(value, Configuration):
+            values.update({(key, *path): v for path, v in _configuration(value).items()})
+        elif value is not None:
+            values[(key,)] = value
+    return values
+
+
+def _solve_size(snapshot: dict, n: int, queue: multiprocessing.Queue) -> None:
+    """
+    Solves a replica of a solver with n additional objects of class object.
+    Used as target of the worker processes when solving several domain sizes in parallel.
+
+    Args:
+        snapshot (dict): The snapshot of the solver to replicate (see SmartOOASPSolver.snapshot).
+        n (int): The number of objects of class object to add to the replica.
+        queue (multiprocessing.Queue): Queue where the tuple (n, ids of the added objects, model or None,
+                                       reason and message of the exceeded budget or None) is put.
+    """
+    solver = SmartOOASPSolver(guided_expansion=snapshot["guided_expansion"], **snapshot["budgets"])
+    for path, value in snapshot["configuration"].items():
+        config = solver.ctl.configuration
+        for key in path[:-1]:
+            config = getattr(config, key)
+        setattr(config, path[-1], value)
+    for f in snapshot["files"]:
+        solver.load(f)
+    for program in snapshot["programs"]:
+        solver.add_program(*program)
+    solver.ctl.ground([("base", [])])
+    solver.add_objects(snapshot["objects"])
+    for o_id in snapshot["disabled"]:
+        solver.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), True)
+    solver.assumptions = AssumptionStore(snapshot["assumptions"])
+    try:
+        with solver.budget():
+            ids = solver.add_placeholder_objects(n)
+            solver.check_budget()
+            queue.put((n, ids, solver.model if solver.solve() else None, None))
+    except BudgetExceeded as e:
+        queue.put((n, [], None, (e.reason, str(e))))
+
 
 class SmartOOASPSolver:
     """
@@ -36,6 +146,18 @@ class SmartOOASPSolver:
         view=False,
         ctl=None,
         associations_with_priority=None,
+        object_pool_size=0,
+        growth_strategy="linear",
+        parallel_sizes=0,
+        guided_expansion=False,
+        cache_size=128,
+        cache_dir=None,
+        cache_disk_size=256 * 1024 * 1024,
+        history_size=100,
+        time_limit=None,
+        max_objects=None,
+        max_atoms=None,
+        event_listener=None,
     ):
         """
         Initialize the solver.
@@ -48,7 +170,36 @@ class SmartOOASPSolver:
             view (bool): If True, saves the solution as a PNG generated by clingraph
             ctl (Control): The control object to use for the solver. This can come from the Application class or True
             associations_with_priority (list[str]): List of associations which will be associated with priority (eg. for performance reasons).
+            object_pool_size (int): Number of placeholder objects grounded ahead of time to be used when solving is UNSAT.
+                                    If 0, placeholder objects are grounded when they are needed.
+            growth_strategy (str): How the domain grows when solving is UNSAT. One of:
+                                   linear (one object per UNSAT result), doubling (the number of objects added
+                                   doubles for consecutive UNSAT results) or bisection (doubling followed by a
+                                   bisection back to the smallest satisfiable size).
+            parallel_sizes (int): Number of domain sizes solved at the same time in worker processes when solving
+                                  is UNSAT. If 0 or 1, the sizes are tried in sequence following the growth strategy.
+            guided_expansion (bool): If True, the potential constraint violations are checked with assumptions
+                                     when solving, and the UNSAT core of an UNSAT result chooses the class of the
+                                     first object added (see expansion_from_core) instead of class object.
+                                     Not used with the bisection strategy, which needs objects of class object.
+                                     Off by default: it does not save iterations, but with the doubling strategy
+                                     it can find smaller configurations.
+            cache_size (int): Number of consequences kept in memory for previously seen states. If 0, nothing is kept.
+            cache_dir (str): Directory where consequences are also stored on disk, under the hash of the loaded files,
+                             to be reused by solvers created later on for the same domain. If None, nothing is stored.
+            cache_disk_size (int): Maximum size in bytes of the files in cache_dir. The least recently used files
+                                   are removed once it is exceeded.
+            history_size (int): Maximum number of steps kept in the journal to be undone.
+            time_limit (float): Seconds a call to smart_complete or get_consequences may take before it raises
+                                BudgetExceeded. If None, there is no limit.
+            max_objects (int): Maximum number of objects added by a call to smart_complete. If None, there is no limit.
+            max_atoms (int): Maximum number of atoms grounded before smart_complete stops adding objects.
+                             If None, there is no limit.
+            event_listener (Callable[[str, dict], None]): Called with the name and the data of each event
+                                                          of the solver (see emit).
         """
+        if growth_strategy not in GROWTH_STRATEGIES:
+            raise ValueError(f"Unknown growth strategy {growth_strategy}, use one of: {', '.join(GROWTH_STRATEGIES)}")
         self.initial_objects = initial_objects if initial_objects is not None else []
         self.smart_generation_functions = (
             smart_generation_functions if smart_generation_functions is not None else []
@@ -57,13 +208,47 @@ class SmartOOASPSolver:
             associations_with_priority if associations_with_priority is not None else []
         )
         self.view = view
+        self.object_pool_size = object_pool_size
+        self.growth_strategy = growth_strategy
+        self.parallel_sizes = parallel_sizes
+        self.guided_expansion = guided_expansion
+        self.time_limit = time_limit
+        self.max_objects = max_objects
+        self.max_atoms = max_atoms
+        self.event_listener = event_listener
 
         self.next_id = 1
-        self.assumptions = set()
+        self.files = []
+        # programs added with add_program, kept to replicate the solver
+        self.programs = []
+        self.grounded_objects = []
+        self.object_pool = []
+        self.removed_objects = set()
+        self.unsat_iterations = 0
+        # potential constraint violations in the UNSAT core of the last solve call
+        self.unsat_core = []
+        self._superclasses = None
+        self.assumptions = AssumptionStore()
+        self.assumptions.listeners.append(self._record_assumption)
+        self.history_size = history_size
+        self.history = []
+        self.redo_history = []
+        self._step = None
+        self._step_depth = 0
+        self._replaying = False
         self.model = None
+        self.model_symbols = None
         self.shown_model = None
+        self.progress = {"iteration": 0, "objects": 0, "unsat_iterations": 0}
+        self._cancellable = False
+        self._cancelled = False
+        self._interrupted = False
+        self._solving = False
+        self._budget = None
+        self._cancel_lock = threading.Lock()
         self.cautious = None
         self.brave = None
+        self.cache = ConsequenceCache(max_entries=cache_size, directory=cache_dir, max_disk_bytes=cache_disk_size)
         self.times = {
             "initialization": 0,
             "smart_generation": {
@@ -73,6 +258,8 @@ class SmartOOASPSolver:
                 "functions": {n: 0 for n in self.smart_generation_functions},
             },
             "ground": 0,
+            "pool": 0,
+            "parallel": 0,
         }
         self.objects = defaultdict(int)
 
@@ -86,6 +273,9 @@ class SmartOOASPSolver:
             self.ctl = ctl
         else:
             self.ctl = Control(["--warn=none"])
+        # number of atoms grounded by the control, updated after every grounding so it can be read
+        # by other threads while the solver is in use
+        self.atoms = len(self.ctl.symbolic_atoms)
 
     @property
     def stats(self) -> dict:
@@ -105,6 +295,8 @@ class SmartOOASPSolver:
                 },
             },
             "ground": round(self.times["ground"], 3),
+            "pool": round(self.times["pool"], 3),
+            "parallel": round(self.times["parallel"], 3),
         }
         considered_conseq = {"cautious": False, "brave": False}
         for f in self.smart_generation_functions:
@@ -119,80 +311,332 @@ class SmartOOASPSolver:
                     3,
                 )
         results = {
-            "#objects": self.next_id - 1,
+            "#objects": self.size,
+            "#pool_objects": len(self.object_pool),
+            "#removed_objects": len(self.removed_objects),
+            "#unsat_iterations": self.unsat_iterations,
             "#objects_added_per_type": self.objects,
+            "consequence_cache": self.cache.stats,
             "times": times,
         }
         return results
 
+    def emit(self, event: str, **data) -> None:
+        """
+        Passes an event to the event listener, if there is one. The events are:
+        iteration (start of an iteration of smart_complete with its progress),
+        smart_function (a smart generation function changed the configuration),
+        objects_added (ids and classes of the objects added), unsat (solving was UNSAT for the current size),
+        model (smart_complete found a model) and timing (the times of the statistics at the end of an iteration).
+
+        Args:
+            event (str): The name of the event
+            **data: The data of the event, which must be serializable as JSON
+        """
+        if self.event_listener is not None:
+            self.event_listener(event, data)
+
+    @property
+    def size(self) -> int:
+        """
+        Number of objects in the configuration, not counting the objects in the pool and the removed objects.
+        """
+        return self.next_id - 1 - len(self.object_pool) - len(self.removed_objects)
+
+    @property
+    def disabled_objects(self) -> list[int]:
+        """
+        Ids of the grounded objects that are disabled, either because they are in the pool or were removed.
+        """
+        return sorted(self.object_pool + list(self.removed_objects))
+
     @property
     def assumption_list(self) -> list[Symbol]:
         """
         List of assumptions for the solver. All association instances are used as assumptions.
         """
-        return [(parse_term(a), True) for a in self.assumptions]
+        return self.assumptions.assumption_list
 
     def create_initial_objects(self) -> None:
         """
         Creates the initial objects based on the input parameter by adding and grounding the objects.
+        All initial objects are grounded as a single batch.
         """
         start = time.time()
-        for o in self.initial_objects:
-            self.add_object(o)
+        self.add_objects(self.initial_objects)
         self.times["initialization"] = time.time() - start
 
-    def ground_forced_inclusion(self, o: str) -> None:
+    def ground_objects(self, objects: list[tuple[int, str, bool]]) -> None:
         """
-        Grounds the program corresponding to the inclusion of the object as a fact of ooasp_isa.
-        We use a different program since adding this as a fact to the right program with .add is not simple.
+        Grounds the programs corresponding to a batch of new objects in a single grounding call.
+        For every object the program domain is grounded and, if the object must be used, also the program include
+        corresponding to the inclusion of the object as a fact of ooasp_isa.
+        All objects but the last one are grounded together with the program inactive, so that the constraints
+        only relevant for the active object are not grounded for them.
+        It also releases the externals of the previous objects and assigns the last object as active
+        to account for the current point in the incremental grounding.
 
         Args:
-            o (str): The name of the class of the object to ground.
+            objects (list[tuple[int, str, bool]]): The id, the name of the class and whether the object must be used
+                                                   for each object to ground. The ids must be consecutive.
         """
-        self.log(f"\t\tGrounding forced inclusion {self.next_id} {o}")
+        parts = []
+        for o_id, o, must_be_used in objects:
+            self.log(f"\t\tGrounding {o_id} {o}")
+            if must_be_used:
+                parts.append(("include", [Number(o_id), Function(o, [])]))
+            parts.append(("domain", [Number(o_id), Function(o, [])]))
+        for o_id, _, _ in objects[:-1]:
+            parts.append(("inactive", [Number(o_id)]))
         start = time.time()
-        self.ctl.ground([("include", [Number(self.next_id), Function(o, [])])])
+        self.ctl.ground(parts)
         self.times["ground"] += time.time() - start
+        self.atoms = len(self.ctl.symbolic_atoms)
+        self.grounded_objects.extend((o, must_be_used) for _, o, must_be_used in objects)
+        first_id = objects[0][0]
+        last_id = objects[-1][0]
+        for o_id in range(first_id - 1, last_id):
+            self.ctl.release_external(Function("active", [Number(o_id)]))
+        self.ctl.assign_external(Function("active", [Number(last_id)]), True)
 
-    def ground(self, o: str) -> None:
+    def add_object(self, o: str, must_be_used: bool = True, removable: bool = False) -> None:
         """
-        Grounds the program corresponding to the new object.
-        It also releases the external for the previous object and assigns the new object as active
-        to account for the current point in the incremental grounding.
+        Adds a new object to the configuration. This addition includes the user predicate
+        to know the class for the object that was added and distinguish it in the encodings.
 
         Args:
             o (str): The name of the class of the object to ground.
+            must_be_used (bool): If True, the object is forced to be included in the configuration.
+            removable (bool): If True, the object can later be removed with remove_object (see add_objects).
+        """
+        self.add_objects([o], must_be_used, removable)
+
+    @journaled
+    def add_objects(
+        self, objects: list[str | tuple[str, bool]], must_be_used: bool = True, removable: bool = False
+    ) -> None:
+        """
+        Adds a batch of new objects to the configuration with consecutive ids starting at next_id.
+        All objects are grounded with a single grounding call and the externals are updated once.
+
+        Args:
+            objects (list[str | tuple[str, bool]]): The names of the classes of the objects to add.
+                                                    An element can also be a tuple with the name of the class and
+                                                    a flag overwriting must_be_used for that object.
+            must_be_used (bool): If True, the objects are forced to be included in the configuration.
+            removable (bool): If True, objects that must be used are forced only by an assumption instead of
+                              grounding the program include, so that they can be removed later on.
+                              This is slower to solve, since the class of the objects is no longer a fact.
+        """
+        batch = []
+        for o in objects:
+            o, used = o if isinstance(o, tuple) else (o, must_be_used)
+            obj_atom = Function("ooasp_isa", [Function(o), Number(self.next_id)])
+            self.log(green(f"\t\tAdding object  {obj_atom}"))
+            self.ctl.add(
+                "domain", [str(self.next_id), o], f"user({obj_atom})."
+            )  # Needed for symmetry breaking
+            if used:
+                self.assumptions.add(obj_atom)
+            self.objects[o] += 1
+            batch.append((self.next_id, o, used and not removable))
+            self.next_id += 1
+        if not batch:
+            return
+        self.ground_objects(batch)
+        self.cautious = None
+        self.brave = None
+        self.emit("objects_added", objects=[[o_id, o] for o_id, o, _ in batch])
+
+    def fill_object_pool(self, missing: int = None) -> None:
+        """
+        Grounds placeholder objects of class object ahead of time until the pool has object_pool_size objects.
+        The placeholders are grounded as a single batch and kept disabled by the external ooasp_disabled
+        until they are taken from the pool.
+
+        Args:
+            missing (int): The number of placeholder objects to ground. By default, the ones missing in the pool.
         """
-        self.log(f"\t\tGrounding {self.next_id} {o}")
+        if missing is None:
+            missing = self.object_pool_size - len(self.object_pool)
+        if missing <= 0:
+            return
         start = time.time()
-        self.ctl.ground([("domain", [Number(self.next_id), Function(o, [])])])
-        self.times["ground"] += time.time() - start
-        if self.next_id > 0:
-            self.ctl.release_external(Function("active", [Number(self.next_id - 1)]))
-        self.ctl.assign_external(Function("active", [Number(self.next_id)]), True)
+        batch = []
+        for o_id in range(self.next_id, self.next_id + missing):
+            self.log(green(f"\t\tAdding placeholder object to pool {o_id}"))
+            self.ctl.add(
+                "domain", [str(o_id), "object"], f"user(ooasp_isa(object,{o_id}))."
+            )  # Needed for symmetry breaking
+            batch.append((o_id, "object", False))
+        self.ground_objects(batch)
+        for o_id, _, _ in batch:
+            self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), True)
+            self.object_pool.append(o_id)
+        self.next_id += missing
+        self.times["pool"] += time.time() - start
 
-    def add_object(self, o: str, must_be_used: bool = True) -> None:
+    def refill_object_pool(self) -> None:
         """
-        Adds a new object to the configuration. This addition includes the user predicate
-        to know the class for the object that was added and distinguish it in the encodings.
+        Refills the object pool once it holds half of object_pool_size objects or fewer.
+        Called after smart_complete found a model, so that the next calls take the objects added when solving
+        is UNSAT from the pool without grounding.
+        The pool is not filled before the first model, since grounding placeholders moves the active object
+        away from the objects the smart generation works on.
+        """
+        if self.object_pool_size > 0 and len(self.object_pool) <= self.object_pool_size // 2:
+            self.fill_object_pool()
+
+    @journaled
+    def add_placeholder_objects(self, n: int = 1) -> list[int]:
+        """
+        Adds n objects of class object to the configuration.
+        If the object pool or the bisection strategy is used, the objects are taken from the pool by enabling
+        their externals instead of grounding them. If the pool runs out of objects, it is refilled as a batch
+        right away, otherwise it is refilled outside of the UNSAT steps by refill_object_pool.
 
         Args:
-            o (str): The name of the class of the object to ground.
+            n (int): The number of objects to add.
+
+        Returns:
+            list[int]: The ids of the added objects.
         """
-        obj_atom = f"ooasp_isa({o},{self.next_id})"
-        self.log(green(f"\t\tAdding object  {obj_atom}"))
-        self.ctl.add(
-            "domain", [str(self.next_id), o], f"user({obj_atom})."
-        )  # Needed for symmetry breaking
-        if must_be_used:
-            self.ground_forced_inclusion(o)  # Used to improve performance
+        if self.object_pool_size <= 0 and self.growth_strategy != "bisection":
+            first_id = self.next_id
+            self.add_objects(["object"] * n)
+            return list(range(first_id, self.next_id))
+        if len(self.object_pool) < n:
+            self.fill_object_pool(max(self.object_pool_size, n - len(self.object_pool)))
+        ids = self.object_pool[:n]
+        self.object_pool = self.object_pool[n:]
+        for o_id in ids:
+            obj_atom = Function("ooasp_isa", [Function("object"), Number(o_id)])
+            self.log(green(f"\t\tEnabling object  {obj_atom}"))
+            self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), False)
             self.assumptions.add(obj_atom)
+        self.objects["object"] += n
+        self.cautious = None
+        self.brave = None
+        self.emit("objects_added", objects=[[o_id, "object"] for o_id in ids])
+        return ids
+
+    @journaled
+    def remove_placeholder_objects(self, ids: list[int]) -> None:
+        """
+        Disables objects of class object taken from the pool and puts them back into the pool.
+
+        Args:
+            ids (list[int]): The ids of the objects to disable.
+        """
+        for o_id in ids:
+            obj_atom = Function("ooasp_isa", [Function("object"), Number(o_id)])
+            self.log(red(f"\t\tDisabling object  {obj_atom}"))
+            self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), True)
+            self.assumptions.discard(obj_atom)
+        self.object_pool = sorted(ids + self.object_pool)
+        self.objects["object"] -= len(ids)
+        self.cautious = None
+        self.brave = None
+
+    @journaled
+    def remove_object(self, o_id: int) -> None:
+        """
+        Removes an object from the configuration by disabling it with the external ooasp_disabled,
+        together with all assumptions mentioning it. Nothing is grounded, and the object can be restored
+        later on with restore_object.
+
+        Args:
+            o_id (int): The id of the object to remove.
+
+        Raises:
+            ValueError: If the object is not in the configuration or was grounded with the program include,
+                        in which case it can not be removed (see add_objects).
+        """
+        if o_id < 1 or o_id >= self.next_id or o_id in self.object_pool or o_id in self.removed_objects:
+            raise ValueError(f"Object {o_id} is not in the configuration")
+        o, included = self.grounded_objects[o_id - 1]
+        if included:
+            raise ValueError(f"Object {o_id} was grounded as must be used and can not be removed")
+        self.log(red(f"\t\tRemoving object  {o_id}"))
+        self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), True)
+        for a in self.assumptions.by_object(o_id):
+            self.assumptions.discard(a)
+        self.removed_objects.add(o_id)
+        self.objects[o] -= 1
+        self.cautious = None
+        self.brave = None
+
+    @journaled
+    def restore_object(self, o_id: int, cls: str = None) -> None:
+        """
+        Enables again an object removed with remove_object, reusing its id without grounding.
+
+        Args:
+            o_id (int): The id of the removed object.
+            cls (str, optional): The class the object must have. It must be the class the object
+                                 was grounded with, or one of its subclasses. By default, the grounded class.
+        """
+        if o_id not in self.removed_objects:
+            raise ValueError(f"Object {o_id} was not removed")
+        o = self.grounded_objects[o_id - 1][0]
+        cls = cls if cls is not None else o
+        self.log(green(f"\t\tRestoring object  ooasp_isa({cls},{o_id})"))
+        self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), False)
+        self.assumptions.add(Function("ooasp_isa", [Function(cls), Number(o_id)]))
+        self.removed_objects.discard(o_id)
         self.objects[o] += 1
-        self.ground(o)
-        self.next_id += 1
         self.cautious = None
         self.brave = None
 
+    @journaled
+    def set_configuration(self, objects: dict[int, str], assumptions: list[str | Symbol]) -> None:
+        """
+        Changes the configuration to the given objects and assumptions, for instance when loading
+        a configuration file on the same domain. Grounded objects that are not needed are removed,
+        removed objects that are needed again are restored, and only objects with new ids are grounded,
+        so the cost depends on the change and not on the size of the configuration.
+        Gaps in the ids are filled with removed objects of class object.
+
+        Args:
+            objects (dict[int, str]): The class of each object by id
+            assumptions (list[str | clingo.Symbol]): All the assumptions of the configuration
+
+        Raises:
+            ValueError: If a grounded object can not be removed or can not take the required class.
+                        The solver is left unchanged in that case, and a new solver has to be used.
+        """
+        last_grounded = min(self.next_id - 1, max(objects, default=0))
+        for o_id in range(1, self.next_id):
+            o, included = self.grounded_objects[o_id - 1]
+            cls = objects.get(o_id)
+            if o_id in self.object_pool:
+                if cls is not None:
+                    raise ValueError(f"Object {o_id} is in the object pool")
+            elif cls is None and included:
+                raise ValueError(f"Object {o_id} was grounded as must be used and can not be removed")
+            elif cls is not None and cls != o and o != "object":
+                raise ValueError(f"Object {o_id} was grounded with class {o} instead of {cls}")
+        self.assumptions.clear()
+        for o_id in range(1, self.next_id):
+            if o_id in self.object_pool:
+                continue
+            cls = objects.get(o_id)
+            if cls is None and o_id not in self.removed_objects:
+                self.remove_object(o_id)
+            elif cls is not None and o_id in self.removed_objects:
+                self.restore_object(o_id, cls)
+        batch = []
+        for o_id in range(self.next_id, max(objects, default=0) + 1):
+            batch.append((objects.get(o_id, "object"), o_id in objects))
+        self.add_objects(batch, removable=True)
+        for o_id in range(last_grounded + 1, self.next_id):
+            if o_id not in objects:
+                self.remove_object(o_id)
+        self.assumptions.update(assumptions)
+        self.cautious = None
+        self.brave = None
+
+    @journaled
     def associate(self, association: tuple[str, int, int]) -> None:
         """_summary_
         Associates two objects with a given association from the model.
@@ -207,18 +651,158 @@ class SmartOOASPSolver:
         self.cautious = None
         self.brave = None
 
+    @journaled
     def choose_attribute_value(self, attr_data) -> None:
         """
         Adds value to an object attribute.
         """
-        for assumption in self.assumptions:
-            if f"ooasp_attr_value({attr_data[0]},{attr_data[1]}" in assumption:
-                self.assumptions.remove(assumption)
         attr_atom = (f"ooasp_attr_value({attr_data[0]},{attr_data[1]},{attr_data[2]})")
-        self.assumptions.add(attr_atom)
+        self.assumptions.set_attribute_value(attr_atom)
+        self.cautious = None
+        self.brave = None
+
+    @contextmanager
+    def journal_step(self):
+        """
+        Context manager grouping all the changes done inside it in a single step of the journal.
+        Steps can be nested, only the outermost one is recorded.
+        Changes done directly on the assumptions outside a step are recorded as one step each.
+        A step grounding objects with the program include can not be undone, since these objects can not be
+        disabled. Such a step is a barrier: it is not recorded and the steps before it are dropped.
+        """
+        if self._step is None:
+            self._step = {"before": self._object_state(), "assumptions": []}
+        self._step_depth += 1
+        try:
+            yield
+        finally:
+            self._step_depth -= 1
+            if self._step_depth == 0:
+                step = self._step
+                self._step = None
+                step["after"] = self._object_state()
+                if any(used for _, used in self.grounded_objects[step["before"]["next_id"] - 1:]):
+                    self.history.clear()
+                    self.redo_history.clear()
+                elif step["assumptions"] or step["before"] != step["after"]:
+                    self.history.append(step)
+                    del self.history[: -self.history_size]
+                    self.redo_history.clear()
+
+    def _record_assumption(self, added: bool, assumption: Symbol) -> None:
+        if self._replaying:
+            return
+        if self._step is None:
+            with self.journal_step():
+                self._step["assumptions"].append((added, assumption))
+        else:
+            self._step["assumptions"].append((added, assumption))
+
+    def _object_state(self) -> dict:
+        return {
+            "next_id": self.next_id,
+            "pool": list(self.object_pool),
+            "removed": set(self.removed_objects),
+            "objects": dict(self.objects),
+        }
+
+    def _set_object_state(self, pool: list[int], removed: set[int], objects: dict) -> None:
+        disabled = set(pool) | removed
+        for o_id in disabled.symmetric_difference(self.disabled_objects):
+            self.ctl.assign_external(Function("ooasp_disabled", [Number(o_id)]), o_id in disabled)
+        self.object_pool = list(pool)
+        self.removed_objects = set(removed)
+        self.objects = defaultdict(int, objects)
+
+    def _replay(self, assumptions: list[tuple[bool, Symbol]], forward: bool) -> None:
+        self._replaying = True
+        try:
+            for added, a in assumptions if forward else reversed(assumptions):
+                if added == forward:
+                    self.assumptions.add(a)
+                else:
+                    self.assumptions.discard(a)
+        finally:
+            self._replaying = False
         self.cautious = None
         self.brave = None
 
+    def undo(self) -> bool:
+        """
+        Undoes the last step of the journal without grounding.
+        Objects grounded in the step are disabled as removed objects, and the assumptions are switched back,
+        so that consequences of the previous state can be taken from the cache.
+
+        Steps before one that grounded objects with the program include are not kept (see journal_step).
+
+        Returns:
+            bool: True if a step was undone, False if there is nothing to undo.
+        """
+        if not self.history:
+            return False
+        step = self.history.pop()
+        before, after = step["before"], step["after"]
+        new_ids = set(range(before["next_id"], after["next_id"]))
+        self.log(red("\t\tUndoing step"))
+        self._set_object_state(before["pool"], before["removed"] | new_ids, before["objects"])
+        self._replay(step["assumptions"], forward=False)
+        self.redo_history.append(step)
+        return True
+
+    def redo(self) -> bool:
+        """
+        Redoes the last undone step without grounding.
+
+        Returns:
+            bool: True if a step was redone, False if there is nothing to redo.
+        """
+        if not self.redo_history:
+            return False
+        step = self.redo_history.pop()
+        after = step["after"]
+        self.log(green("\t\tRedoing step"))
+        self._set_object_state(after["pool"], after["removed"], after["objects"])
+        self._replay(step["assumptions"], forward=True)
+        self.history.append(step)
+        return True
+
+    def _enumerate_consequences(self, enum_mode: str) -> tuple[list[Symbol], int]:
+        """
+        Enumerates the models of the current configuration with the given enumeration mode.
+        Expects the potential constraint violations to be disabled by the caller.
+
+        Args:
+            enum_mode (str): The clingo enumeration mode, either "cautious" or "brave"
+
+        Returns:
+            tuple[list[clingo.Symbol], int]: List of symbols representing the consequences
+            and the number of models found by the enumeration.
+        """
+        consequences = None
+        models = 0
+        self.check_cancelled()
+        self.check_budget()
+        self.ctl.configuration.solve.enum_mode = enum_mode
+        with self.ctl.solve(
+            yield_=True,
+            async_=True,
+            assumptions=self.assumption_list,
+            on_statistics=self.on_statistics,
+        ) as hdn, self._interruptible():
+            while True:
+                hdn.resume()
+                self._wait(hdn)
+                model = hdn.model()
+                if model is None:
+                    break
+                consequences = model.symbols(shown=True)
+                models += 1
+            # the consequences of an interrupted enumeration are not complete
+            self.check_cancelled()
+            if consequences is None:
+                raise Unsatisfiable(f"UNSAT {enum_mode}!")
+        return consequences, models
+
     def get_cautious(self) -> list[Symbol]:
         """
         Obtains and stores the cautious consequences of the current configuration.
@@ -228,24 +812,7 @@ class SmartOOASPSolver:
         """
         if self.cautious is not None:
             return self.cautious
-        start = time.time()
-        self.ctl.assign_external(Function("check_potential_cv"), False)
-        self.ctl.configuration.solve.models = "0"
-        self.ctl.configuration.solve.enum_mode = "cautious"
-        with self.ctl.solve(
-            yield_=True,
-            assumptions=self.assumption_list,
-            on_statistics=self.on_statistics,
-        ) as hdn:
-            for model in hdn:
-                self.cautious = model.symbols(shown=True)
-            if self.cautious is None:
-                raise Exception("UNSAT cautious!")
-        self.ctl.assign_external(Function("check_potential_cv"), True)
-        self.ctl.configuration.solve.models = "1"
-        self.ctl.configuration.solve.enum_mode = "auto"
-        self.times["smart_generation"]["cautious"] += time.time() - start
-        return self.cautious
+        return self.get_consequences(brave=False)[0]
 
     def get_brave(self) -> list[Symbol]:
         """
@@ -254,28 +821,66 @@ class SmartOOASPSolver:
         Returns:
             list[clingo.Symbol]: List of symbols representing the brave consequences.
         """
-
         if self.brave is not None:
             return self.brave
-        start = time.time()
-        self.ctl.assign_external(Function("check_potential_cv"), False)
-        self.ctl.configuration.solve.models = "0"
-        self.ctl.configuration.solve.enum_mode = "brave"
-        with self.ctl.solve(
-            yield_=True,
-            assumptions=self.assumption_list,
-            on_statistics=self.on_statistics,
-        ) as hdn:
-            for model in hdn:
-                self.brave = model.symbols(shown=True)
-            if self.brave is None:
-                raise Exception("UNSAT brave!")
+        return self.get_consequences(cautious=False)[1]
 
-        self.ctl.assign_external(Function("check_potential_cv"), True)
-        self.ctl.configuration.solve.models = "1"
-        self.ctl.configuration.solve.enum_mode = "auto"
-        self.times["smart_generation"]["brave"] += time.time() - start
-        return self.brave
+    @budgeted
+    def get_consequences(
+        self, cautious: bool = True, brave: bool = True
+    ) -> tuple[list[Symbol], list[Symbol]]:
+        """
+        Obtains and stores the cautious and the brave consequences of the current configuration.
+        Both enumerations share the same solving setup and run one after the other on the same control.
+        If the cautious enumeration finds a single model, the configuration has no other completion,
+        so the brave consequences are the same and their enumeration is skipped.
+        Consequences that are already stored are not computed again. Consequences of previously seen states
+        are taken from the cache, which is keyed by the assumptions and the grounded and disabled objects.
+
+        Args:
+            cautious (bool, optional): Whether the cautious consequences are computed. Defaults to True.
+            brave (bool, optional): Whether the brave consequences are computed. Defaults to True.
+
+        Returns:
+            tuple[list[clingo.Symbol], list[clingo.Symbol]]: The cautious and the brave consequences,
+            None for the ones that were not requested and are not stored.
+        """
+        key = None
+        missing = (cautious and self.cautious is None) or (brave and self.brave is None)
+        if missing and (self.cache.max_entries > 0 or self.cache.directory is not None):
+            if self.cache.directory is not None and self.cache.domain is None:
+                self.cache.domain = domain_key(self.files, os.path.join("ooasp", "encodings"), self.programs)
+            key = state_key(self.assumptions.canonical, self.grounded_objects, self.disabled_objects)
+            if cautious and self.cautious is None:
+                self.cautious = self.cache.get(key, "cautious")
+            if brave and self.brave is None:
+                self.brave = self.cache.get(key, "brave")
+        cautious = cautious and self.cautious is None
+        brave = brave and self.brave is None
+        if cautious or brave:
+            self.ctl.assign_external(Function("check_potential_cv"), False)
+            self.ctl.configuration.solve.models = "0"
+            try:
+                if cautious:
+                    start = time.time()
+                    self.cautious, models = self._enumerate_consequences("cautious")
+                    self.times["smart_generation"]["cautious"] += time.time() - start
+                    if brave and models == 1:
+                        self.brave = self.cautious
+                if brave and self.brave is None:
+                    start = time.time()
+                    self.brave = self._enumerate_consequences("brave")[0]
+                    self.times["smart_generation"]["brave"] += time.time() - start
+            finally:
+                self.ctl.assign_external(Function("check_potential_cv"), True)
+                self.ctl.configuration.solve.models = "1"
+                self.ctl.configuration.solve.enum_mode = "auto"
+            if key is not None:
+                if cautious:
+                    self.cache.put(key, "cautious", self.cautious)
+                if brave:
+                    self.cache.put(key, "brave", self.brave)
+        return self.cautious, self.brave
 
     def save_png(
         self, directory: str = "./out", suffix: str = "", extra_prg="", name="config"
@@ -336,6 +941,7 @@ class SmartOOASPSolver:
                 self.log(
                     f"Smart generation: added {len(self.assumptions) - initial_assumptions} assumptions"
                 )
+                self.emit("smart_function", function=f, assumptions=len(self.assumptions) - initial_assumptions)
                 return True
         return False
 
@@ -371,12 +977,13 @@ class SmartOOASPSolver:
                 added_key = (o_id, assoc)
             if added_key != (o_id, assoc):
                 continue
-            for _ in range(added, needed.number):
+            first_id = self.next_id
+            self.add_objects([c.name] * (needed.number - added))
+            for new_id in range(first_id, self.next_id):
                 if str(opt) == "1":
-                    a = (str(assoc), o_id, self.next_id)
+                    a = (str(assoc), o_id, new_id)
                 else:
-                    a = (str(assoc), self.next_id, o_id)
-                self.add_object(c.name)
+                    a = (str(assoc), new_id, o_id)
                 self.associate(a)
                 added += 1
         return added > 0
@@ -410,9 +1017,8 @@ class SmartOOASPSolver:
                 added_key = c
             if added_key != c:
                 continue
-            for _ in range(added, needed.number):
-                self.add_object(c.name)
-                added += 1
+            self.add_objects([c.name] * (needed.number - added))
+            added = max(added, needed.number)
         return added > 0
 
     def global_lb_gap(self) -> bool:
@@ -445,9 +1051,8 @@ class SmartOOASPSolver:
                 added_key = c
             if added_key != c:
                 continue
-            for _ in range(added, needed.number):
-                self.add_object(c.name)
-                added += 1
+            self.add_objects([c.name] * (needed.number - added))
+            added = max(added, needed.number)
         return added > 0
 
     def association_possible(self) -> bool:
@@ -478,19 +1083,78 @@ class SmartOOASPSolver:
                 return True
         return False
 
+    def load(self, path: str) -> None:
+        """
+        Loads a file into the control object and keeps track of it to replicate the solver.
+
+        Args:
+            path (str): The path of the file to load.
+        """
+        self.ctl.load(path)
+        self.files.append(path)
+        self._superclasses = None
+        self.cache.domain = None
+        self.cache.clear()
+
+    def add_program(self, name: str, parameters: list[str], program: str) -> None:
+        """
+        Adds a program to the control object and keeps track of it to replicate the solver.
+        Programs of the part base are grounded by load_base.
+
+        Args:
+            name (str): The name of the program part.
+            parameters (list[str]): The parameters of the program part.
+            program (str): The program.
+        """
+        self.ctl.add(name, parameters, program)
+        self.programs.append((name, list(parameters), program))
+        self.cache.domain = None
+        self.cache.clear()
+
     def load_base(self) -> None:
         """
         Loads the base encodings to solve the configuration
         """
         encodings_path = os.path.join("ooasp", "encodings", "ooasp.lp")
-        self.ctl.load(encodings_path)
+        self.load(encodings_path)
         self.ctl.ground([("base", [])])
+        self.atoms = len(self.ctl.symbolic_atoms)
+
+    def snapshot(self) -> dict:
+        """
+        Obtains the information needed to replicate the solver in a different process.
+        Only files loaded with the method load and programs added with add_program are considered.
+        The budgets are the ones left for the running call, if any.
+
+        Returns:
+            dict: The loaded files and added programs, the options of the configuration of the control,
+                  the grounded objects, the ids of the disabled objects, the assumptions, the budgets and
+                  whether guided expansion is used.
+        """
+        budgets = {"time_limit": self.time_limit, "max_objects": self.max_objects, "max_atoms": self.max_atoms}
+        if self._budget is not None:
+            if self._budget["deadline"] is not None:
+                budgets["time_limit"] = max(0, self._budget["deadline"] - time.time())
+            if self.max_objects is not None:
+                budgets["max_objects"] = self.max_objects - (self.size - self._budget["size"])
+        return {
+            "files": list(self.files),
+            "programs": list(self.programs),
+            "configuration": _configuration(self.ctl.configuration),
+            "objects": list(self.grounded_objects),
+            "disabled": self.disabled_objects,
+            "assumptions": list(self.assumptions.canonical),
+            "budgets": budgets,
+            "guided_expansion": self.guided_expansion,
+        }
 
     def on_model(self, m: Model) -> None:
         """
-        Callback when a model is found
+        Callback when a model is found. The model is kept both as facts in self.model and as symbols
+        in self.model_symbols.
         """
-        self.model = [str(s) + "." for s in m.symbols(atoms=True)]
+        self.model_symbols = m.symbols(atoms=True)
+        self.model = [str(s) + "." for s in self.model_symbols]
 
     def on_statistics(self, step: StatisticsMap, accu: StatisticsMap) -> None:
         """
@@ -499,35 +1163,399 @@ class SmartOOASPSolver:
         update_dict = {"OOASP": self.stats}
         accu.update(update_dict)
 
+    def solve(self) -> bool:
+        """
+        Solves for the current configuration to find a complete configuration with the current objects.
+        The model found is stored in self.model
+        With guided expansion, the potential constraint violations are assumed to be false instead of being
+        forbidden by the external check_potential_cv, and the ones in the UNSAT core are stored in self.unsat_core.
+
+        Returns:
+            bool: True if a configuration was found, False otherwise.
+        """
+        self.log(subtitle(f"Solving for size {self.size}...", "RED"))
+        self.check_cancelled()
+        self.check_budget()
+        self.ctl.configuration.solve.models = "1"
+        assumptions = self.assumption_list
+        potential_cvs = {}
+        if self.guided_expansion:
+            potential_cvs = self.potential_cv_literals()
+            assumptions = assumptions + [(cv, False) for cvs in potential_cvs.values() for cv in cvs]
+        self.unsat_core = []
+        self.ctl.assign_external(Function("check_potential_cv"), not self.guided_expansion)
+        try:
+            with self.ctl.solve(
+                assumptions=assumptions,
+                on_model=self.on_model,
+                async_=True,
+                on_statistics=self.on_statistics,
+            ) as hdl, self._interruptible():
+                self._wait(hdl)
+                result = hdl.get()
+                self.check_cancelled()
+                if result.satisfiable:
+                    self.log(green("SAT"))
+                    return True
+                # the violations are assumed to be false, so they appear negated in the core
+                self.unsat_core = [cv for lit in hdl.core() for cv in potential_cvs.get(-lit, [])]
+        finally:
+            self.ctl.assign_external(Function("check_potential_cv"), True)
+        self.log(red("UNSAT"))
+        self.unsat_iterations += 1
+        self.emit("unsat", objects=self.size)
+        return False
+
+    def potential_cv_literals(self) -> dict[int, list[Symbol]]:
+        """
+        Obtains the grounded atoms of the potential constraint violations.
+
+        Returns:
+            dict[int, list[Symbol]]: The atoms by their solver literal.
+        """
+        potential = {atom.symbol.arguments[0] for atom in self.ctl.symbolic_atoms.by_signature("ooasp_potential_cv", 1)}
+        literals = defaultdict(list)
+        for atom in self.ctl.symbolic_atoms.by_signature("ooasp_cv", 4):
+            if atom.symbol.arguments[0] in potential:
+                literals[atom.literal].append(atom.symbol)
+        return literals
+
+    @property
+    def superclasses(self) -> dict[str, set[str]]:
+        """
+        The superclasses of each class of the knowledge base, including the class itself.
+        Read from the grounded base program when first needed.
+        """
+        if self._superclasses is None:
+            self._superclasses = defaultdict(set)
+            for atom in self.ctl.symbolic_atoms.by_signature("ooasp_subclass_ref", 2):
+                sub, sup = atom.symbol.arguments
+                self._superclasses[sub.name].add(sup.name)
+        return self._superclasses
+
+    def shrink_core(self) -> bool:
+        """
+        Solves again assuming only the lower bound violations of the UNSAT core to be false, since the core found
+        by the solver is not minimal. If it is still UNSAT, the UNSAT core is replaced by the new one.
+
+        Returns:
+            bool: True if the UNSAT core was replaced.
+        """
+        lowerbounds = defaultdict(list)
+        for cv in self.unsat_core:
+            if cv.arguments[0].name == "lowerbound":
+                lowerbounds[self.ctl.symbolic_atoms[cv].literal].append(cv)
+        if not lowerbounds:
+            return False
+        self.check_cancelled()
+        self.check_budget()
+        self.ctl.assign_external(Function("check_potential_cv"), False)
+        try:
+            with self.ctl.solve(
+                assumptions=self.assumption_list + [(cv, False) for cvs in lowerbounds.values() for cv in cvs],
+                async_=True,
+                on_statistics=self.on_statistics,
+            ) as hdl, self._interruptible():
+                self._wait(hdl)
+                result = hdl.get()
+                self.check_cancelled()
+                if result.satisfiable:
+                    return False
+                self.unsat_core = [cv for lit in hdl.core() for cv in lowerbounds.get(-lit, [])]
+        finally:
+            self.ctl.assign_external(Function("check_potential_cv"), True)
+        return True
+
+    def expansion_from_core(self) -> tuple[str, tuple[int, str, int]]:
+        """
+        Chooses the class of the next object to add from the UNSAT core of the last solve call.
+        If the core only holds lower bound violations, the configuration can only become satisfiable with a new
+        object associated to one of the objects missing it, so the new object can be of the most specific class
+        common to the classes they need. If the core holds a single lower bound, the new object can be associated
+        to the object missing it. A core holding other violations is first shrunk with shrink_core.
+
+        Returns:
+            tuple[str, tuple[int, str, int]]: The class of the new object and the id of the object missing it,
+                                              the association and the side of that object in the association,
+                                              None if there are several. None if the core does not choose the class.
+        """
+        if any(cv.arguments[0].name != "lowerbound" for cv in self.unsat_core):
+            self.shrink_core()
+        needs = set()
+        for cv in self.unsat_core:
+            if cv.arguments[0].name != "lowerbound":
+                return None
+            assoc, _, _, cls, side, _ = cv.arguments[3].arguments
+            needs.add((cv.arguments[1].number, assoc.name, side.number, cls.name))
+        if not needs:
+            return None
+        common = set.intersection(*(self.superclasses[cls] for _, _, _, cls in needs))
+        cls = max(common, key=lambda c: len(self.superclasses[c]), default="object")
+        if cls == "object":
+            return None
+        need = next(iter(needs))[:3] if len(needs) == 1 else None
+        return cls, need
+
+    @journaled
+    def add_objects_from_core(self, n: int = 1) -> list[int]:
+        """
+        Adds n objects after an UNSAT result. The first object is of the class chosen by the UNSAT core,
+        and associated to the object missing it if there is only one, see expansion_from_core.
+        The other objects, or all of them if the core does not choose a class, are of class object.
+
+        Args:
+            n (int): The number of objects to add.
+
+        Returns:
+            list[int]: The ids of the added objects.
+        """
+        expansion = self.expansion_from_core() if self.guided_expansion else None
+        if expansion is None or self.growth_strategy == "bisection":
+            return self.add_placeholder_objects(n)
+        cls, need = expansion
+        new_id = self.next_id
+        self.log(f"\t  ---> UNSAT core needs {cls}")
+        self.add_object(cls)
+        if need is not None:
+            o_id, assoc, side = need
+            self.associate((assoc, o_id, new_id) if side == 1 else (assoc, new_id, o_id))
+        if n > 1:
+            return [new_id] + self.add_placeholder_objects(n - 1)
+        return [new_id]
+
+    @contextmanager
+    def cancellable(self):
+        """
+        Context manager for solving methods run in another thread that can be cancelled with cancel.
+        Cancellations requested outside of it are ignored.
+        """
+        with self._cancel_lock:
+            self._cancellable = True
+            self._cancelled = False
+        try:
+            yield
+        finally:
+            with self._cancel_lock:
+                self._cancellable = False
+                self._cancelled = False
+                if self._interrupted:
+                    # An interrupt arriving after the search finished is kept by clingo for the next solve call,
+                    # it is consumed by a solve call that is UNSAT without search
+                    cv = Function("check_potential_cv")
+                    self.ctl.solve(assumptions=[(cv, True), (cv, False)])
+                    self._interrupted = False
+
+    @contextmanager
+    def _interruptible(self):
+        with self._cancel_lock:
+            self._solving = True
+        try:
+            yield
+        finally:
+            with self._cancel_lock:
+                self._solving = False
+
+    def cancel(self) -> None:
+        """
+        Cancels the solving method running inside cancellable: the running solve call is interrupted
+        and the method raises SolveCancelled.
+        """
+        with self._cancel_lock:
+            if not self._cancellable:
+                return
+            self._cancelled = True
+            if self._solving:
+                self.ctl.interrupt()
+                self._interrupted = True
+
+    def check_cancelled(self) -> None:
+        """
+        Raises SolveCancelled once if the solver was cancelled.
+        """
+        if self._cancelled:
+            self._cancelled = False
+            raise SolveCancelled()
+
+    @contextmanager
+    def budget(self):
+        """
+        Context manager applying the budgets of the solver to the calls inside it.
+        Budgets are counted from the outermost context.
+        """
+        if self._budget is not None:
+            yield
+            return
+        self._budget = {
+            "deadline": time.time() + self.time_limit if self.time_limit is not None else None,
+            "size": self.size,
+        }
+        try:
+            yield
+        finally:
+            self._budget = None
+
+    def check_budget(self) -> None:
+        """
+        Raises BudgetExceeded if the running call exceeded one of the budgets of the solver.
+        """
+        if self._budget is None:
+            return
+        if self._budget["deadline"] is not None and time.time() >= self._budget["deadline"]:
+            raise BudgetExceeded("timeout", f"Time limit of {self.time_limit}s exceeded")
+        if self.max_objects is not None and self.size - self._budget["size"] > self.max_objects:
+            raise BudgetExceeded("objects", f"More than {self.max_objects} objects added")
+        if self.max_atoms is not None and self.atoms > self.max_atoms:
+            raise BudgetExceeded("atoms", f"More than {self.max_atoms} atoms grounded")
+
+    def _wait(self, handle: SolveHandle) -> None:
+        """
+        Waits for an asynchronous solve call until the time limit of the running call,
+        cancelling it when the limit is reached.
+        """
+        timeout = None
+        if self._budget is not None and self._budget["deadline"] is not None:
+            timeout = max(0, self._budget["deadline"] - time.time())
+        if not handle.wait(timeout):
+            handle.cancel()
+            raise BudgetExceeded("timeout", f"Time limit of {self.time_limit}s exceeded")
+
+    def bisect(self, ids: list[int]) -> None:
+        """
+        Bisection back to the smallest satisfiable size after the objects in ids made the configuration satisfiable
+        while the configuration without them was UNSAT.
+        The objects are disabled and enabled using their externals, the ones not needed are put back into the pool.
+        The model of the smallest satisfiable size is kept in self.model.
+
+        Args:
+            ids (list[int]): The ids of the objects of class object added in the last step.
+        """
+        lo, hi = 0, len(ids)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            self.log(subtitle(f"Bisection between {lo} and {hi} objects: trying {mid}"))
+            self.remove_placeholder_objects(ids[mid:hi])
+            if self.solve():
+                hi = mid
+            else:
+                lo = mid
+                self.add_placeholder_objects(hi - mid)
+
+    def solve_in_parallel(self) -> bool:
+        """
+        Solves for parallel_sizes domain sizes at the same time, each one in a worker process with its own replicated
+        control object and assumptions. The worker for size i adds i objects of class object.
+        The smallest satisfiable size wins and the other workers are cancelled.
+        The objects of the winner are added to the configuration.
+        The workers are started with spawn instead of fork, so that they do not inherit locks held by other
+        threads of the process, and replicate the solver from its snapshot, including its budgets.
+
+        Returns:
+            bool: True if one of the sizes was satisfiable, False otherwise.
+
+        Raises:
+            BudgetExceeded: If a worker exceeded the budgets left for the running call.
+        """
+        self.log(subtitle(f"Solving in parallel for {self.parallel_sizes} sizes...", "RED"))
+        start = time.time()
+        snapshot = self.snapshot()
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        workers = {
+            n: context.Process(target=_solve_size, args=(snapshot, n, queue), daemon=True)
+            for n in range(1, self.parallel_sizes + 1)
+        }
+        for worker in workers.values():
+            worker.start()
+        results = {}
+        winner = None
+        try:
+            while winner is None and len(results) < len(workers):
+                try:
+                    n, ids, model, exceeded = queue.get(timeout=0.1)
+                except Empty:
+                    self.check_cancelled()
+                    self.check_budget()
+                    continue
+                if exceeded is not None:
+                    raise BudgetExceeded(*exceeded)
+                results[n] = (ids, model)
+                for n in workers:
+                    if n not in results:
+                        break
+                    if results[n][1] is not None:
+                        winner = n
+                        break
+        finally:
+            for worker in workers.values():
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            self.times["parallel"] += time.time() - start
+        self.unsat_iterations += len([n for n, r in results.items() if r[1] is None and (winner is None or n < winner)])
+        if winner is None:
+            self.log(red(f"UNSAT for all {self.parallel_sizes} sizes"))
+            self.emit("unsat", objects=self.size + self.parallel_sizes)
+            self.add_placeholder_objects(self.parallel_sizes)
+            return False
+        self.log(green(f"SAT with {winner} additional objects"))
+        ids, model = results[winner]
+        if self.add_placeholder_objects(winner) == ids:
+            self.model = model
+            self.model_symbols = [parse_term(fact[:-1]) for fact in model]
+            return True
+        return self.solve()
+
+    @journaled
+    @budgeted
     def smart_complete(self) -> None:
         """
         Iterates over the smart generation and solving steps to complete the configuration.
         It stops when a solution is found.
+        When solving is UNSAT, objects are added following the growth strategy, the first one of the class
+        chosen by the UNSAT core with guided expansion and the others of class object.
+        The current iteration and number of objects are kept in self.progress.
+
+        Raises:
+            SolveCancelled: If the solver was cancelled with cancel. The changes done until then are kept
+                            and recorded in the journal (see journal_step).
+            BudgetExceeded: If the call exceeded the time limit or added more than max_objects objects,
+                            or the solver grounded more than max_atoms atoms. The changes done until then are kept
+                            and recorded in the journal (see journal_step).
         """
         done = False
+        step = 1
+        added = []
+        unsat = False
 
         iteration = 0
         while not done:
             iteration += 1
-            self.log("\n" + title(f"Next iteration: {self.next_id - 1} objects"))
+            self.progress = {"iteration": iteration, "objects": self.size, "unsat_iterations": self.unsat_iterations}
+            self.emit("iteration", **self.progress)
+            self.check_cancelled()
+            self.check_budget()
+            self.log("\n" + title(f"Next iteration: {self.size} objects"))
             start = time.time()
             things_done = self.smart_generation()
             self.times["smart_generation"]["time"] += time.time() - start
+            if self.event_listener is not None:
+                self.emit("timing", times=self.stats["times"])
             if things_done:
+                step = 1
+                added = []
+                unsat = False
                 continue
-            self.log(subtitle(f"Solving for size {self.next_id - 1}...", "RED"))
-            self.ctl.configuration.solve.models = "1"
-            self.ctl.assign_external(Function("check_potential_cv"), True)
-            with self.ctl.solve(
-                assumptions=self.assumption_list,
-                on_model=self.on_model,
-                yield_=True,
-                on_statistics=self.on_statistics,
-            ) as hdl:
-                if hdl.get().satisfiable:
-                    self.log(green("SAT"))
-                    done = True
-                else:
-                    self.log(red("UNSAT"))
-                    self.add_object("object")
-                continue
+            if not unsat and self.solve():
+                done = True
+                if self.growth_strategy == "bisection" and len(added) > 1:
+                    self.bisect(added)
+            elif self.parallel_sizes > 1:
+                done = self.solve_in_parallel()
+                # The size with all objects added by the workers is already known to be UNSAT
+                unsat = not done
+            else:
+                added = self.add_objects_from_core(step)
+                if self.growth_strategy != "linear":
+                    step *= 2
+        self.refill_object_pool()
+        self.emit("model", objects=self.size, unsat_iterations=self.unsat_iterations)
@@ -0,0 +1,14 @@
+import os
+import pytest
+
+
+@pytest.fixture
+def solver_api(tmp_path, monkeypatch):
+    root = os.getcwd()
+    monkeypatch.syspath_prepend(os.path.join(root, "ooasp", "REST"))
+    # the server creates its files in the working directory
+    monkeypatch.chdir(tmp_path)
+    from ooasp.REST import solver_api
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(solver_api, "CACHE_DIR", None)
+    yield solver_api
@@ -0,0 +1,42 @@
+from clingo import parse_term
+
+from ooasp.assumptions import AssumptionStore
+
+
+def test_read_facts(tmp_path):
+    from ooasp.assumptions import read_facts
+    saved = tmp_path / "saved.lp"
+    saved.write_text("% configuration\nooasp_isa(frame,1).\n\nooasp_attr_value(frame_position,1,2).\n")
+    facts = read_facts(str(saved))
+    assert [str(f) for f in facts] == ["ooasp_isa(frame,1)", "ooasp_attr_value(frame_position,1,2)"]
+    rules = tmp_path / "rules.lp"
+    rules.write_text("ooasp_isa(frame,1). ooasp_isa(frame,2).\nooasp_isa(rack,X+2) :- ooasp_isa(frame,X).\n")
+    assert len(read_facts(str(rules))) == 4
+    store = AssumptionStore()
+    changes = []
+    store.listeners.append(lambda added, a: changes.append(a))
+    store.update(facts + facts)
+    assert len(store) == 2 and len(changes) == 2
+    assert str(store.attribute_value(1, "frame_position")) == "ooasp_attr_value(frame_position,1,2)"
+
+
+def test_config_format(tmp_path):
+    from ooasp.config_format import read_records, load_facts, save_facts, is_config, lp_to_config, config_to_lp
+    facts = [parse_term(f) for f in ["ooasp_isa(frame,1)", "ooasp_associated(rack_frames,2,1)",
+                                     "ooasp_attr_value(frame_position,1,3)", 'ooasp_attr_value(name,1,"a, b")',
+                                     "ooasp_attr_value(t,1,(1,-2))", "user(ooasp_isa(frame,1))"]]
+    compact = str(tmp_path / "config.jsonl")
+    save_facts(compact, facts, compact=True)
+    assert is_config(compact)
+    assert set(load_facts(compact)) == set(facts)
+    with open(compact) as f:
+        assert list(read_records(f, ["objects", "associations"])) == [
+            ("objects", ["frame", 1]), ("associations", ["rack_frames", 2, 1])]
+    # the format of an existing file is kept
+    save_facts(compact, facts[:1])
+    assert is_config(compact) and load_facts(compact) == facts[:1]
+    lp, back = str(tmp_path / "config.lp"), str(tmp_path / "back.jsonl")
+    config_to_lp(compact, lp)
+    assert not is_config(lp) and load_facts(lp) == facts[:1]
+    lp_to_config(lp, back)
+    assert open(back).read() == open(compact).read()
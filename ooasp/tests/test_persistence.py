@@ -0,0 +1,97 @@
+import os
+
+from clingo import parse_term
+
+from ooasp.assumptions import AssumptionStore
+
+
+def test_configuration_map(tmp_path):
+    import json
+    from ooasp.REST.file_manager.ProjectManagerInterface import ConfigurationMap
+    path = tmp_path / "map.json"
+    mapping = ConfigurationMap(path, min_compaction=3)
+    mapping.add({"name": "a", "domain": "racks", "icon": "", "description": ""})
+    mapping.add({"name": "b", "domain": "racks", "icon": "", "description": ""})
+    mapping.rename("a", "c")
+    assert mapping.journal_size == 3 and [c["name"] for c in mapping.of_domain("racks")] == ["b", "c"]
+    # a change interrupted while being written is ignored
+    with open(mapping.journal_path, "a") as f:
+        f.write('{"op": "delete", "na')
+    mapping = ConfigurationMap(path, min_compaction=3)
+    assert [c["name"] for c in mapping] == ["b", "c"]
+    mapping.update("b", domain="other")
+    assert mapping.journal_size == 0 and mapping.of_domain("other") == [mapping.get("b")]
+    mapping.delete("c")
+    assert list(ConfigurationMap(path)) == [{"name": "b", "domain": "other", "icon": "", "description": ""}]
+    with open(path) as f:
+        assert len(json.load(f)) == 2
+
+
+def test_domain_registry(tmp_path):
+    import json
+    from ooasp.REST.file_manager.ProjectManagerInterface import DomainRegistry, METADATA
+
+    def write(name, description):
+        os.makedirs(tmp_path / name, exist_ok=True)
+        with open(tmp_path / name / METADATA, "w") as f:
+            json.dump({"name": name, "description": description}, f)
+    write("racks", "a")
+    registry = DomainRegistry(tmp_path)
+    assert registry.names() == ["racks"]
+    metadata = registry.metadata("racks")
+    assert registry.metadata("racks") is metadata
+    write("racks", "changed")
+    write("other", "b")
+    assert sorted(registry.names()) == ["other", "racks"]
+    assert registry.metadata("racks")["description"] == "changed"
+    os.remove(tmp_path / "other" / METADATA)
+    assert registry.metadata("other") is None
+
+
+def test_save_queue(tmp_path):
+    from ooasp.assumptions import read_facts
+    from ooasp.REST.persistence import SaveQueue
+    saves = SaveQueue(delay=0.05)
+    path = str(tmp_path / "conf.lp")
+    built = []
+
+    def facts(n):
+        built.append(n)
+        return [parse_term(f"ooasp_isa(frame,{i})") for i in range(1, n + 1)]
+    versions = [saves.submit(path, lambda n=n: facts(n)) for n in range(1, 6)]
+    assert saves.wait(path, timeout=5)
+    # the saves of a burst are written once with the latest state
+    assert built == [5] and saves.persisted(path) == versions[-1] == saves.version(path)
+    assert read_facts(path) == facts(5)
+    assert not os.path.exists(path + ".tmp")
+    missing = str(tmp_path / "missing" / "conf.lp")
+    assert not saves.wait(missing, saves.submit(missing, []), timeout=5)
+    assert saves.error(missing) is not None and saves.persisted(missing) == 0
+
+
+def test_change_log(tmp_path):
+    from ooasp.config_format import load_facts
+    from ooasp.REST.persistence import ChangeTracker, SaveQueue
+    saves = SaveQueue(delay=0)
+    path = str(tmp_path / "conf.lp")
+    store = AssumptionStore(["ooasp_isa(rack,1)", "ooasp_isa(frame,2)"])
+    tracker = ChangeTracker()
+    tracker.attach(store)
+    assert tracker.take(path) is None
+    saves.submit(path, list(store))
+    tracker.saved(path)
+    store.add("ooasp_associated(rack_frames,1,2)")
+    store.discard("ooasp_isa(frame,2)")
+    saves.wait(path, saves.append(path, tracker.take(path)))
+    with open(path + ".log") as f:
+        assert f.read().splitlines()[1:] == ["+ooasp_associated(rack_frames,1,2)", "-ooasp_isa(frame,2)"]
+    assert set(load_facts(path)) == set(store)
+    # the log is ignored once the file is written by someone else
+    with open(path, "a") as f:
+        f.write("ooasp_isa(frame,3).\n")
+    assert len(load_facts(path)) == 3
+    # the file is rewritten with the changes once the log is larger than the file
+    saves = SaveQueue(delay=0)
+    saves.submit(path, list(store))
+    saves.wait(path, saves.append(path, [(True, parse_term(f"ooasp_isa(frame,{i})")) for i in range(3, 5000)]))
+    assert not os.path.exists(path + ".log") and len(load_facts(path)) == 4999
@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+def test_consequences_endpoints(solver_api):
+    from fastapi.testclient import TestClient
+    client = TestClient(solver_api.app, headers={"X-Session-Id": "test_consequences"})
+    assert client.post("/system/actions/initialise", json={"objects": "frame"}).status_code == 200
+    assert client.get("/configurator/solver/consequences/brave").status_code == 200
+    # the position is not in the domain of the attribute
+    assert client.post("/configurator/attribute/frame_position/1/99").status_code == 200
+    for kind in ["cautious", "brave"]:
+        r = client.get(f"/configurator/solver/consequences/{kind}")
+        assert r.status_code == 400 and "'data': 'unsat'" in r.json()
+
+
+def test_busy_session(solver_api):
+    from fastapi.testclient import TestClient
+    client = TestClient(solver_api.app, headers={"X-Session-Id": "test_busy"})
+    assert client.post("/system/actions/initialise", json={"objects": "frame"}).status_code == 200
+    session = solver_api.sessions.get("test_busy")
+    started, done = threading.Event(), threading.Event()
+
+    def job():
+        # holds the session like a running job
+        with session.lock, session.solver_lock:
+            started.set()
+            done.wait()
+    thread = threading.Thread(target=job)
+    thread.start()
+    started.wait()
+    try:
+        assert client.post("/configurator/attribute/frame_position/1/1").status_code == 503
+    finally:
+        done.set()
+        thread.join()
+    assert client.post("/configurator/attribute/frame_position/1/1").status_code == 200
+
+
+def test_import_job(solver_api):
+    from fastapi.testclient import TestClient
+    client = TestClient(solver_api.app, headers={"X-Session-Id": "test_import"})
+    assert client.post("/system/actions/initialise", json={"objects": "frame"}).status_code == 200
+    session = solver_api.sessions.get("test_import")
+    assert client.post("/jobs/import/missing.lp").status_code == 200
+    job = solver_api.jobs.of_session(session)[-1]
+    while job.finished is None or session.busy:
+        time.sleep(0.05)
+    assert job.status == "failed" and job.error is not None
+    assert session.open_configuration_file is None
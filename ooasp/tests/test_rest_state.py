@@ -0,0 +1,64 @@
+import os
+
+from ooasp.assumptions import AssumptionStore
+
+
+def test_graph():
+    from ooasp.REST.graph import GraphBuilder
+    store = AssumptionStore(["ooasp_isa(rack,1)", "ooasp_isa(frame,2)", "ooasp_associated(rack_frames,1,2)"])
+    graph = GraphBuilder()
+    graph.attach(store)
+    possibilities = {"associations": [{"from": "1", "to": "2", "assoc_name": "rack_frames"}],
+                     "attrs": [{"name": "frame_position", "object_id": "2", "value": str(p)} for p in range(1, 3)],
+                     "violations": [{"violation_name": "lowerbound", "object_id": "1", "message": ""}]}
+    data = graph.build(possibilities)
+    assert [n["id"] for n in data["nodes"]] == ["1", "2"]
+    assert [e["id"] for e in data["edges"]] == ["rack_frames-1-2"]
+    rack, frame = (n["data"] for n in data["nodes"])
+    assert len(rack["assocs"]) == 1 and len(rack["violations"]) == 1 and "violations" not in frame
+    assert frame["attributes"] == [{"name": "frame_position",
+                                    "values": {"1", "2"}, "active_value": None, "object_id": "2"}]
+    store.set_attribute_value("ooasp_attr_value(frame_position,2,2)")
+    store.discard("ooasp_associated(rack_frames,1,2)")
+    data = graph.build(possibilities)
+    assert data["nodes"][1]["data"]["attributes"][0]["active_value"] == "2"
+    assert data["edges"] == []
+    store.clear()
+    assert graph.build(possibilities) == {"nodes": [], "edges": []}
+
+
+def test_state_history():
+    from ooasp.REST.state import StateHistory
+    history = StateHistory(max_versions=2)
+    node = {"id": "1", "data": {"attributes": []}}
+    possibilities = {"objects": [{"id": "1", "class": "frame"}], "violations": []}
+    v1 = history.update(1, possibilities, lambda: {"nodes": [node], "edges": []})
+    assert history.update(1, possibilities, None) == v1
+    # the same content does not create a new version
+    assert history.update(2, dict(possibilities), lambda: {"nodes": [node], "edges": []}) == v1
+    changed = {"id": "1", "data": {"attributes": [{"name": "frame_position"}]}}
+    v2 = history.update(3, {"objects": [], "violations": [{"object_id": "1"}]},
+                        lambda: {"nodes": [changed, {"id": "2"}], "edges": []})
+    assert v2 > v1
+    delta = history.delta(v1)
+    assert delta["version"] == v2 and delta["nodes"] == {"added": [{"id": "2"}], "removed": [], "changed": [changed]}
+    assert delta["options"]["objects"] == {"added": [], "removed": [{"id": "1", "class": "frame"}]}
+    assert delta["violations"] == {"added": [{"object_id": "1"}], "removed": []}
+    history.update(4, {}, lambda: {"nodes": [], "edges": []})
+    assert history.delta(v1) is None
+    assert sorted(history.delta(v2)["nodes"]["removed"]) == ["1", "2"]
+
+
+def test_kb_catalog():
+    from ooasp.catalog import kb_catalog
+    catalog = kb_catalog(os.path.join("examples", "racks", "kb.lp"))
+    assert kb_catalog(os.path.join("examples", "racks", "kb.lp")) is catalog
+    assert "frame" in catalog.leafclasses and "rack" not in catalog.leafclasses
+    assert set(catalog.subclasses["rack"]) == {"rackSingle", "rackDouble"}
+    assert set(catalog.superclasses["moduleI"]) == {"module", "object"}
+    assert catalog.associations["rack_frames"] == {"from": "rack", "fromMin": "1", "fromMax": "1",
+                                                   "to": "frame", "toMin": "4", "toMax": "8"}
+    assert "rack_frames" in catalog.class_associations["frame"]
+    assert set(catalog.specializations["rack_frames"]) == {"rack_framesS", "rack_framesD"}
+    assert catalog.class_attributes("frame") == {"frame_position": "enumint"}
+    assert catalog.attribute_list == [{"class": "frame", "attribute": "frame_position", "type": "enumint"}]
@@ -1,12 +1,19 @@
 from smart_ooasp import *
+from clingo import parse_term
 import pytest
+import threading
+
+SMART_GENERATION_FUNCTIONS = ["association_possible", "assoc_needs_object", "global_lb_gap", "global_ub_gap"]
 
 
 @pytest.fixture
-def init_solver():
-    solver = SmartOOASPSolver(smart_generation_functions=["association_possible", "assoc_needs_object", "global_lb_gap", "global_ub_gap"],
-                              initial_objects=["elementA", "moduleII", "elementB", "rack", "object", "frame", "frame"])
-    solver.ctl.load(os.path.join("examples", "racks", "kb.lp"))
+def init_solver(request):
+    # the options of the solver can be overwritten by parametrizing the fixture indirectly
+    options = {"smart_generation_functions": SMART_GENERATION_FUNCTIONS,
+               "initial_objects": ["elementA", "moduleII", "elementB", "rack", "object", "frame", "frame"]}
+    options.update(getattr(request, "param", {}))
+    solver = SmartOOASPSolver(**options)
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
     solver.load_base()
     solver.create_initial_objects()
     yield solver
@@ -20,6 +27,8 @@ def test_initialisation():
     assert solver.next_id == 1
     assert solver.assumptions == set()
     assert len(solver.times["smart_generation"]["functions"].keys()) == 2
+    with pytest.raises(ValueError):
+        SmartOOASPSolver(growth_strategy="quadratic")
 
 
 def test_grounding(init_solver):
@@ -34,6 +43,7 @@ def test_grounding(init_solver):
     for i in range(20):
         solver.add_object("frame")
     assert initial_ground < solver.times["ground"]
+    assert solver.atoms == len(solver.ctl.symbolic_atoms)
 
 
 def test_solve(init_solver):
@@ -42,3 +52,347 @@ def test_solve(init_solver):
     solver.smart_complete()
     print(solver.model)
     assert solver.model is not None
+
+
+def test_add_objects():
+    objects = ["elementA", "moduleII", "object", "rack", "frame"]
+    sequential = SmartOOASPSolver()
+    batch = SmartOOASPSolver()
+    for solver in [sequential, batch]:
+        solver.load(os.path.join("examples", "racks", "kb.lp"))
+        solver.load_base()
+    for o in objects:
+        sequential.add_object(o, must_be_used=o != "object")
+    batch.add_objects([(o, o != "object") for o in objects])
+    assert batch.next_id == sequential.next_id == len(objects) + 1
+    assert batch.assumptions == sequential.assumptions
+    assert "ooasp_isa(object,3)" not in batch.assumptions
+    assert {str(s) for s in batch.get_brave()} == {str(s) for s in sequential.get_brave()}
+
+
+def test_assumption_store():
+    store = AssumptionStore(["ooasp_isa(frame,1)", "ooasp_associated(rack_frames,2,1)"])
+    store.add(parse_term("ooasp_attr_value(frame_position,1,1)"))
+    store.set_attribute_value("ooasp_attr_value(frame_position,1,2)")
+    assert len(store) == 3
+    assert "ooasp_attr_value(frame_position,1,1)" not in store
+    assert str(store.attribute_value(1, "frame_position")) == "ooasp_attr_value(frame_position,1,2)"
+    assert {str(s) for s in store.by_object(1)} == {
+        "ooasp_isa(frame,1)", "ooasp_associated(rack_frames,2,1)", "ooasp_attr_value(frame_position,1,2)"}
+    assert {str(s) for s in store.by_predicate("ooasp_associated")} == {"ooasp_associated(rack_frames,2,1)"}
+    assumption_list = store.assumption_list
+    assert store.assumption_list is assumption_list
+    store.discard("ooasp_associated(rack_frames,2,1)")
+    assert store.assumption_list is not assumption_list and len(store.assumption_list) == 2
+    assert store.by_object(2) == set()
+
+
+def test_consequences():
+    objects = ["elementA", "elementA", "elementB", "object"]
+    separate = SmartOOASPSolver(objects)
+    combined = SmartOOASPSolver(objects)
+    for solver in [separate, combined]:
+        solver.load(os.path.join("examples", "racks", "kb.lp"))
+        solver.load_base()
+        solver.create_initial_objects()
+    cautious, brave = combined.get_consequences()
+    assert combined.cautious is cautious and combined.brave is brave
+    assert {str(s) for s in cautious} == {str(s) for s in separate.get_cautious()}
+    assert {str(s) for s in brave} == {str(s) for s in separate.get_brave()}
+    assert combined.get_consequences(brave=False) == (cautious, brave)
+    combined.add_object("rack")
+    assert combined.get_consequences(brave=False)[1] is None
+    # a configuration with a single completion does not need the brave enumeration
+    combined.smart_complete()
+    for symbol in combined.model_symbols:
+        if symbol.name in ["ooasp_isa", "ooasp_associated", "ooasp_attr_value"]:
+            combined.assumptions.add(symbol)
+    brave_time = combined.times["smart_generation"]["brave"]
+    cautious, brave = combined.get_consequences()
+    assert brave is cautious and combined.times["smart_generation"]["brave"] == brave_time
+
+
+def test_consequence_cache(tmp_path):
+    solvers = []
+    for _ in range(2):
+        solver = SmartOOASPSolver(["elementA", "moduleI", "frame"], cache_size=2, cache_dir=str(tmp_path))
+        solver.load(os.path.join("examples", "racks", "kb.lp"))
+        solver.load_base()
+        solver.create_initial_objects()
+        solvers.append(solver)
+    solver = solvers[0]
+    brave = solver.get_brave()
+    solver.associate(("element_modules1", 1, 2))
+    solver.get_brave()
+    solver.assumptions.discard("ooasp_associated(element_modules1,1,2)")
+    solver.brave = None
+    assert solver.get_brave() is brave
+    assert solver.cache.stats["hits"] == 1 and solver.cache.stats["misses"] == 2
+    solver.choose_attribute_value(("frame_position", 3, 1))
+    solver.get_brave()
+    assert solver.stats["consequence_cache"]["entries"] == 2
+    assert solver.cache.stats["evictions"] == 1
+    assert {str(s) for s in solvers[1].get_brave()} == {str(s) for s in brave}
+    assert solvers[1].cache.stats["disk_hits"] == 1
+    # the least recently used files are removed once the directory is too large
+    cache = ConsequenceCache(max_entries=0, directory=str(tmp_path / "bounded"), max_disk_bytes=150)
+    cache.domain = "racks"
+    symbols = [parse_term(f"ooasp_isa(frame,{i})") for i in range(1, 4)]
+    for key in ["a", "b", "c", "d"]:
+        cache.put(key, "brave", symbols)
+        time.sleep(0.01)
+        assert cache.get("a", "brave") == symbols
+        time.sleep(0.01)
+    assert cache.stats["disk_evictions"] == 2 and cache.disk_bytes <= 150
+    assert cache.get("b", "brave") is None and cache.get("c", "brave") is None
+    cache.clear(disk=True)
+    assert cache.get("d", "brave") is None and os.listdir(tmp_path / "bounded" / "racks") == []
+
+
+def test_remove_object():
+    solver = SmartOOASPSolver()
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
+    solver.load_base()
+    solver.set_configuration({1: "frame", 3: "rack"}, ["ooasp_isa(frame,1)", "ooasp_isa(rack,3)"])
+    assert solver.next_id == 4 and solver.removed_objects == {2} and solver.size == 2
+    assert not any(str(s).startswith("ooasp_isa(") and s.arguments[1].number == 2 for s in solver.get_brave())
+    solver.set_configuration({1: "frame", 2: "frame", 3: "rack"},
+                             ["ooasp_isa(frame,1)", "ooasp_isa(frame,2)", "ooasp_isa(rack,3)"])
+    assert solver.next_id == 4 and solver.removed_objects == set()
+    assert len(solver.grounded_objects) == 3
+    assert "ooasp_isa(frame,2)" in {str(s) for s in solver.get_cautious()}
+    solver.associate(("rack_frames", 3, 2))
+    solver.remove_object(2)
+    assert solver.assumptions.by_object(2) == set()
+    assert solver.size == 2 and solver.stats["#removed_objects"] == 1
+    solver.add_object("frame")
+    with pytest.raises(ValueError):
+        solver.remove_object(4)
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["elementA", "frame"]}], indirect=True)
+def test_undo_redo(init_solver):
+    solver = init_solver
+    initial = set(solver.assumptions)
+    solver.add_object("moduleI", removable=True)
+    brave = {str(s) for s in solver.get_brave()}
+    solver.associate(("element_modules1", 1, 3))
+    solver.choose_attribute_value(("frame_position", 2, 1))
+    solver.choose_attribute_value(("frame_position", 2, 2))
+    after = set(solver.assumptions)
+    # the initial objects were grounded with the program include, so their step is not kept
+    assert len(solver.history) == 4
+    assert solver.undo() and solver.undo() and solver.undo()
+    assert solver.assumptions == {*initial, parse_term("ooasp_isa(moduleI,3)")}
+    hits = solver.cache.hits
+    assert {str(s) for s in solver.get_brave()} == brave
+    assert solver.cache.hits == hits + 1
+    assert solver.undo()
+    assert solver.assumptions == initial and solver.removed_objects == {3} and solver.size == 2
+    assert not solver.undo()
+    while solver.redo():
+        pass
+    assert solver.assumptions == after and solver.removed_objects == set() and solver.size == 3
+    assert len(solver.grounded_objects) == 3
+    solver.undo()
+    solver.choose_attribute_value(("frame_position", 2, 3))
+    assert solver.redo_history == [] and not solver.redo()
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["elementA", "frame"]}], indirect=True)
+def test_undo_smart_complete(init_solver, solver_api):
+    from fastapi.testclient import TestClient
+    solver = init_solver
+    solver.choose_attribute_value(("frame_position", 2, 1))
+    size = solver.size
+    solver.smart_complete()
+    # the objects added by smart_complete can not be removed, so the steps before it are dropped
+    assert solver.size > size and solver.history == []
+    assumptions = set(solver.assumptions)
+    solver.choose_attribute_value(("frame_position", 2, 2))
+    assert solver.undo() and solver.assumptions == assumptions
+    assert not solver.undo() and solver.assumptions == assumptions
+
+    client = TestClient(solver_api.app, headers={"X-Session-Id": "test_undo"})
+    assert client.post("/system/actions/initialise", json={"objects": "elementA,frame"}).status_code == 200
+    assert client.post("/configurator/attribute/frame_position/2/1").status_code == 200
+    session = solver_api.sessions.get("test_undo")
+    assert client.post("/configurator/solver/solve").status_code == 200
+    job = solver_api.jobs.of_session(session)[-1]
+    while job.finished is None or session.busy:
+        time.sleep(0.05)
+    assert job.status == "done"
+    assumptions = set(session.solver.assumptions)
+    assert client.post("/configurator/attribute/frame_position/2/2").status_code == 200
+    assert client.post("/configurator/undo").status_code == 200
+    assert session.solver.assumptions == assumptions
+    r = client.post("/configurator/undo")
+    assert r.status_code == 400 and "Nothing to undo." in r.json()
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["frame"] * 13}], indirect=True)
+def test_cancel(init_solver):
+    solver = init_solver
+    # cancellations requested outside of cancellable are ignored
+    solver.cancel()
+    with solver.cancellable():
+        assert solver.get_cautious() is not None
+    result = {}
+
+    def run():
+        with solver.cancellable():
+            try:
+                solver.smart_complete()
+            except SolveCancelled:
+                result["cancelled"] = solver.progress
+
+    t = threading.Thread(target=run)
+    t.start()
+    time.sleep(0.2)
+    solver.cancel()
+    t.join()
+    assert result["cancelled"]["iteration"] > 0
+    solver.smart_complete()
+    assert solver.model is not None
+
+
+@pytest.mark.parametrize("init_solver,reason", [
+    ({"initial_objects": ["frame"] * 13, **budget}, reason)
+    for budget, reason in [({"time_limit": 0.1}, "timeout"), ({"max_objects": 2}, "objects"),
+                           ({"max_atoms": 1000}, "atoms")]],
+    indirect=["init_solver"])
+def test_budgets(init_solver, reason):
+    solver = init_solver
+    with pytest.raises(BudgetExceeded) as e:
+        solver.smart_complete()
+    assert e.value.reason == reason
+    if reason == "objects":
+        assert solver.size <= 13 + 2 + 1
+    solver.time_limit = solver.max_objects = solver.max_atoms = None
+    solver.smart_complete()
+    assert solver.model is not None
+
+
+def test_events():
+    events = []
+    solver = SmartOOASPSolver(smart_generation_functions=SMART_GENERATION_FUNCTIONS,
+                              initial_objects=["frame"] * 9, event_listener=lambda e, data: events.append((e, data)))
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
+    solver.load_base()
+    solver.create_initial_objects()
+    assert events == [("objects_added", {"objects": [[i, "frame"] for i in range(1, 10)]})]
+    solver.smart_complete()
+    names = [e for e, _ in events]
+    assert names.count("unsat") == solver.unsat_iterations
+    assert names.count("iteration") == names.count("timing")
+    assert "smart_function" in names
+    assert events[-1] == ("model", {"objects": 14, "unsat_iterations": solver.unsat_iterations})
+
+
+def test_extraction(init_solver, monkeypatch):
+    from ooasp.extraction import extract, _records
+    symbols = [parse_term(a) for a in ["ooasp_isa(frame,1)", "ooasp_associated(rack_frames,2,1)",
+                                       "ooasp_attr_value(frame_position,1,3)",
+                                       'ooasp_cv(lowerbound,1,"Lowerbound for {} not reached: {}",(rack_frames,4))',
+                                       "association_possible(rack_frames,2,1,new_object)", "ooasp_leafclass(frame)",
+                                       "ooasp_domain(frame,1)"]]
+    extraction = extract(symbols)
+    assert extract(symbols) is extraction
+    assert [(o.cls, o.id) for o in extraction.objects] == [("frame", "1")]
+    assert extraction.associations[0][:3] == ("rack_frames", "2", "1")
+    assert extraction.attribute_values[0].value == "3"
+    assert extraction.violations[0].message == "Lowerbound for rack_frames not reached: 4"
+    assert extraction.violations[0].args == ("rack_frames", "4")
+    assert extraction.suggestions[0][:2] == ("association_possible", ("rack_frames", "2", "1", "new_object"))
+    assert extraction.leafclasses == ["frame"]
+    init_solver.get_brave()
+    objects = extract(init_solver.brave).objects
+    assert len(objects) > 0 and all(o.symbol.name == "ooasp_isa" for o in objects)
+    # only the records of the most recently extracted symbols are kept
+    monkeypatch.setattr("ooasp.extraction.RECORDS_SIZE", 3)
+    assert len(extract(list(symbols)).objects) == 1
+    assert list(_records) == symbols[-3:]
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["frame"] * 9, "object_pool_size": 4}], indirect=True)
+def test_object_pool(init_solver):
+    solver = init_solver
+    assert solver.object_pool == []
+    solver.smart_complete()
+    assert solver.model is not None
+    assert solver.stats["#objects"] == 14
+    assert solver.objects["object"] == 4
+    assert solver.times["pool"] > 0
+    # the pool ran out in the last UNSAT step and was refilled after the model was found
+    assert solver.object_pool == list(range(solver.next_id - 4, solver.next_id))
+
+
+@pytest.mark.parametrize("init_solver,n_objects", [
+    ({"initial_objects": ["frame"] * 9, "growth_strategy": growth_strategy}, n_objects)
+    for growth_strategy, n_objects in [("linear", 14), ("doubling", 17), ("bisection", 14)]], indirect=["init_solver"])
+def test_growth_strategy(init_solver, n_objects):
+    solver = init_solver
+    solver.smart_complete()
+    assert solver.model is not None
+    assert solver.stats["#objects"] == n_objects
+    assert solver.stats["#unsat_iterations"] > 0
+    assert len([a for a in solver.model if a.startswith("ooasp_isa_leaf(")]) <= n_objects
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["frame"], "smart_generation_functions": [],
+                                          "guided_expansion": True}], indirect=True)
+def test_guided_expansion(init_solver):
+    solver = init_solver
+    assert not solver.solve()
+    assert [cv.arguments[0].name for cv in solver.unsat_core] == ["lowerbound"]
+    assert solver.expansion_from_core() == ("rack", (1, "rack_frames", 2))
+    solver.smart_complete()
+    assert solver.model is not None
+    assert solver.stats["#objects"] == 5
+    assert solver.objects["rack"] == 1
+    assert "ooasp_associated(rack_frames,2,1)" in solver.assumptions
+
+
+@pytest.mark.parametrize("init_solver", [{"initial_objects": ["frame"] * 9, "smart_generation_functions": [],
+                                          "guided_expansion": guided_expansion} for guided_expansion in [True, False]],
+                         indirect=True)
+def test_guided_expansion_size(init_solver):
+    solver = init_solver
+    solver.smart_complete()
+    assert solver.stats["#objects"] == 14
+    assert (solver.objects["object"] < 5) == solver.guided_expansion
+
+
+@pytest.mark.parametrize("init_solver,n_objects", [
+    ({"initial_objects": ["rack"], "smart_generation_functions": ["association_possible"],
+      "growth_strategy": "doubling", "guided_expansion": guided_expansion}, n_objects)
+    for guided_expansion, n_objects in [(True, 5), (False, 8)]], indirect=["init_solver"])
+def test_guided_expansion_doubling(init_solver, n_objects):
+    solver = init_solver
+    solver.smart_complete()
+    # the core chooses the classes of the added objects, so doubling overshoots less
+    assert solver.model is not None
+    assert solver.stats["#objects"] == n_objects
+
+
+def test_parallel_sizes():
+    solver = SmartOOASPSolver(smart_generation_functions=SMART_GENERATION_FUNCTIONS,
+                              initial_objects=["frame"] * 9, parallel_sizes=3)
+    solver.load(os.path.join("examples", "racks", "kb.lp"))
+    solver.add_program("base", [], "#show parallel/0. parallel.")
+    solver.ctl.configuration.solver.heuristic = "Vsids"
+    solver.load_base()
+    solver.create_initial_objects()
+    snapshot = solver.snapshot()
+    assert snapshot["files"] == [os.path.join("examples", "racks", "kb.lp"),
+                                 os.path.join("ooasp", "encodings", "ooasp.lp")]
+    assert snapshot["programs"] == [("base", [], "#show parallel/0. parallel.")]
+    assert snapshot["configuration"][("solver", "heuristic")].startswith("vsids")
+    solver.time_limit = 60
+    with solver.budget():
+        assert 0 < solver.snapshot()["budgets"]["time_limit"] <= 60
+    solver.time_limit = None
+    solver.smart_complete()
+    assert solver.model is not None and "parallel." in solver.model
+    assert solver.stats["#objects"] == 14
+    assert solver.times["parallel"] > 0